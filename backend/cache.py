@@ -1,42 +1,582 @@
 import os
+import json
+import time
+import uuid
 import pickle
+import shutil
 import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Union
 
-CACHE_DIR = Path(".cache")
+import numpy as np
+import networkx as nx
+import geopandas as gpd
+import shapely
+
+from backend.roads import RoadNetwork, highway_class, keeps_highway, prune_graph, DEFAULT_CLASS, edge_rows
+
+try:
+    import pyarrow as pa
+except ImportError:  # columnar formats disabled, everything is pickled
+    pa = None
+
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Byte budget for the whole directory (0 = unbounded) and default entry lifetime in seconds (0 = forever)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+CACHE_TTL = int(os.getenv("CACHE_TTL", str(30 * 24 * 3600)))
+# Eviction frees space down to this fraction of the budget, so it does not run on every write
+CACHE_LOW_WATERMARK = 0.9
+# Between directory scans, writes are added to a running total; rescan after this many writes
+# anyway, since other worker processes share the directory
+CACHE_RESCAN_WRITES = int(os.getenv("CACHE_RESCAN_WRITES", "256"))
+
+# Shared second level (L2) for all worker nodes, disabled when no bucket is set
+CACHE_S3_BUCKET = os.getenv("CACHE_S3_BUCKET", "")
+CACHE_S3_PREFIX = os.getenv("CACHE_S3_PREFIX", "osm/")
+
+META_SUFFIX = ".meta"
+TMP_SUFFIX = ".tmp"
+
+
+class PickleCodec:
+    """Fallback for any Python object."""
+    suffix = ".pkl"
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return True
+
+    @staticmethod
+    def dump(value: Any, path: Path) -> None:
+        with open(path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: Path) -> Any:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+class GeoParquetCodec:
+    """Feature layers (GeoDataFrame) as GeoParquet."""
+    suffix = ".parquet"
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return pa is not None and isinstance(value, gpd.GeoDataFrame)
+
+    @staticmethod
+    def dump(value: gpd.GeoDataFrame, path: Path) -> None:
+        value.to_parquet(path)
+
+    @staticmethod
+    def load(path: Path) -> gpd.GeoDataFrame:
+        return gpd.read_parquet(path)
+
+
+class GraphArrowCodec:
+    """
+    Street graphs as a single Arrow IPC edge table (memory-mapped on read).
+    Only what the renderer needs survives the round trip: node x/y, edge
+    `highway` (first tag) and `geometry`, plus the graph CRS.
+    """
+    suffix = ".arrow"
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return pa is not None and isinstance(value, nx.MultiDiGraph)
+
+    @staticmethod
+    def to_table(G: nx.MultiDiGraph) -> "pa.Table":
+        xs = dict(G.nodes(data='x'))
+        ys = dict(G.nodes(data='y'))
+        u, v, k, highway, geometry = [], [], [], [], []
+        for eu, ev, ek, data in G.edges(keys=True, data=True):
+            hw = data.get('highway')
+            if isinstance(hw, list):
+                hw = hw[0] if hw else None
+            u.append(eu)
+            v.append(ev)
+            k.append(ek)
+            highway.append(hw)
+            geometry.append(data.get('geometry'))
+
+        return pa.table({
+            "u": pa.array(u, type=pa.int64()),
+            "v": pa.array(v, type=pa.int64()),
+            "key": pa.array(k, type=pa.int64()),
+            "ux": pa.array([xs[n] for n in u], type=pa.float64()),
+            "uy": pa.array([ys[n] for n in u], type=pa.float64()),
+            "vx": pa.array([xs[n] for n in v], type=pa.float64()),
+            "vy": pa.array([ys[n] for n in v], type=pa.float64()),
+            "highway": pa.array(highway, type=pa.string()),
+            "geometry": pa.array(shapely.to_wkb(np.asarray(geometry, dtype=object)), type=pa.binary()),
+        }, metadata={"crs": str(G.graph.get('crs', ''))})
+
+    @staticmethod
+    def dump(G: nx.MultiDiGraph, path: Path) -> None:
+        table = GraphArrowCodec.to_table(G)
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @staticmethod
+    def read_table(path: Path) -> "pa.Table":
+        """Memory-mapped edge table; buffers stay valid as long as the table lives."""
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+    @staticmethod
+    def roads_from_tables(tables: List["pa.Table"], bbox=None, road_filter: str = "all") -> RoadNetwork:
+        """
+        Build one packed RoadNetwork from edge tables (e.g. neighbouring tiles).
+        Edges present in several tables are kept once; with a (west, south,
+        east, north) `bbox`, only edges with an endpoint inside survive, and
+        edges dropped by `road_filter` (see roads.ROAD_FILTERS) are skipped.
+        """
+        crs = (tables[0].schema.metadata or {}).get(b"crs", b"").decode() or None
+        table = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+        column = lambda name: table.column(name).to_numpy()
+
+        if len(tables) > 1:
+            _, first = np.unique(edge_rows(column("u"), column("v"), column("key")), return_index=True)
+            table = table.take(np.sort(first))
+        if bbox is not None:
+            west, south, east, north = bbox
+            inside = lambda x, y: (x >= west) & (x <= east) & (y >= south) & (y <= north)
+            table = table.filter(inside(column("ux"), column("uy")) | inside(column("vx"), column("vy")))
+
+        # Classify (and filter) each distinct highway value once
+        highway = table.column("highway").combine_chunks().dictionary_encode()
+        values = highway.dictionary.to_pylist() + [None]
+        codes = highway.indices.fill_null(len(values) - 1).to_numpy()
+        if road_filter != "all":
+            kept = np.array([keeps_highway(h, road_filter) for h in values])[codes]
+            table, codes = table.filter(pa.array(kept)), codes[kept]
+        lut = np.array([highway_class(h) for h in values[:-1]] + [DEFAULT_CLASS], dtype=np.uint8)
+
+        return RoadNetwork.from_edges(
+            column("u"), column("v"), column("key"), lut[codes],
+            np.column_stack([column("ux"), column("uy")]),
+            np.column_stack([column("vx"), column("vy")]),
+            shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False)),
+            crs=crs,
+        )
+
+    @staticmethod
+    def load(path: Path) -> nx.MultiDiGraph:
+        with pa.memory_map(str(path), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            crs = table.schema.metadata.get(b"crs", b"").decode() or None
+
+            u = table.column("u").to_numpy()
+            v = table.column("v").to_numpy()
+            k = table.column("key").to_numpy()
+            node_x = np.concatenate([table.column("ux").to_numpy(), table.column("vx").to_numpy()])
+            node_y = np.concatenate([table.column("uy").to_numpy(), table.column("vy").to_numpy()])
+            geoms = shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+            highway = table.column("highway").to_pylist()
+            nodes = np.concatenate([u, v])
+
+        def attrs(hw, geom):
+            data = {} if hw is None else {'highway': hw}
+            if geom is not None:
+                data['geometry'] = geom
+            return data
+
+        G = nx.MultiDiGraph(crs=crs)
+        G.add_nodes_from((n, {'x': x, 'y': y}) for n, x, y in zip(nodes.tolist(), node_x.tolist(), node_y.tolist()))
+        G.add_edges_from(
+            (eu, ev, ek, attrs(hw, g))
+            for eu, ev, ek, hw, g in zip(u.tolist(), v.tolist(), k.tolist(), highway, geoms)
+        )
+        return G
+
+
+# Tried in order on write; the first codec accepting the value wins
+CODECS = [GraphArrowCodec, GeoParquetCodec, PickleCodec]
+
+
+class S3Tier:
+    """
+    Shared L2 behind the local directory: zstd-compressed copies of the cache
+    files in CACHE_S3_BUCKET, keyed by hash, so a new or redeployed worker
+    node starts warm. Reads go through into L1; writes are uploaded in the
+    background (write-back), `flush()` waits for them.
+    """
+    _client = None
+    _executor = None
+    _pending = set()
+    # After an S3 failure, skip L2 for a while instead of stalling every lookup
+    _unavailable_until = 0.0
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(CACHE_S3_BUCKET) and pa is not None and time.time() >= S3Tier._unavailable_until
+
+    @staticmethod
+    def _s3():
+        if S3Tier._client is None:
+            from backend.storage import get_s3_client
+            S3Tier._client = get_s3_client()
+        return S3Tier._client
+
+    @staticmethod
+    def _disable(e: Exception) -> None:
+        print(f"L2 cache disabled for 60s: {e}")
+        S3Tier._unavailable_until = time.time() + 60
+
+    @staticmethod
+    def fetch(hashed: str):
+        """
+        Download and decompress an entry next to L1. Returns (suffix, temp
+        path, meta) for the caller to install, or None if absent/expired.
+        """
+        if not S3Tier.enabled():
+            return None
+        try:
+            obj = S3Tier._s3().get_object(Bucket=CACHE_S3_BUCKET, Key=f"{CACHE_S3_PREFIX}{hashed}")
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code not in ("NoSuchKey", "404"):
+                S3Tier._disable(e)
+            return None
+
+        info = obj.get("Metadata", {})
+        suffix = info.get("suffix")
+        expires = float(info["expires"]) if info.get("expires") else None
+        if suffix not in {codec.suffix for codec in CODECS} or (expires is not None and expires <= time.time()):
+            return None
+
+        packed = CACHE_DIR / f"{hashed}.zst.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        tmp = CACHE_DIR / f"{hashed}{suffix}.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        try:
+            with open(packed, "wb") as f:
+                shutil.copyfileobj(obj["Body"], f)
+            with pa.CompressedInputStream(str(packed), "zstd") as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        except Exception as e:
+            print(f"L2 cache read error for {hashed}: {e}")
+            DiskCache._remove(tmp)
+            return None
+        finally:
+            DiskCache._remove(packed)
+        return suffix, tmp, {"created": float(info.get("created") or time.time()), "expires": expires}
+
+    @staticmethod
+    def put(hashed: str, path: Path, meta: Dict[str, Any]) -> None:
+        if not S3Tier.enabled():
+            return
+        if S3Tier._executor is None:
+            S3Tier._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="l2-upload")
+        future = S3Tier._executor.submit(S3Tier._upload, hashed, path, meta)
+        S3Tier._pending.add(future)
+        future.add_done_callback(S3Tier._pending.discard)
+
+    @staticmethod
+    def _upload(hashed: str, path: Path, meta: Dict[str, Any]) -> None:
+        packed = CACHE_DIR / f"{hashed}.zst.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        try:
+            with open(path, "rb") as src, pa.CompressedOutputStream(str(packed), "zstd") as dst:
+                shutil.copyfileobj(src, dst)
+            metadata = {"suffix": path.suffix, "created": str(meta["created"]),
+                        "expires": "" if meta["expires"] is None else str(meta["expires"])}
+            S3Tier._s3().upload_file(str(packed), CACHE_S3_BUCKET, f"{CACHE_S3_PREFIX}{hashed}",
+                                     ExtraArgs={"Metadata": metadata})
+            DiskCache._counters["l2_uploads"] += 1
+            DiskCache._counters["l2_bytes_uploaded"] += packed.stat().st_size
+        except FileNotFoundError:
+            pass  # evicted or replaced locally before the upload started
+        except Exception as e:
+            S3Tier._disable(e)
+        finally:
+            DiskCache._remove(packed)
+
+    @staticmethod
+    def flush() -> None:
+        wait(list(S3Tier._pending))
+
+
 class DiskCache:
     """
-    Robust file-based cache using MD5 hashes of keys.
+    Bounded file-based cache using MD5 hashes of keys.
+    The file format is chosen per value type (see CODECS).
+
+    Each entry is written atomically (temp file + rename) next to a small
+    `.meta` JSON holding its key and expiry. Reads refresh the file mtime, which
+    drives LRU eviction once the directory exceeds CACHE_MAX_BYTES.
+
+    This directory is the L1 of each worker; with CACHE_S3_BUCKET set, misses
+    read through a shared S3Tier and writes are copied to it.
     """
+    # Per-process counters, see stats()
+    _counters = Counter()
+    # Directory size at the last scan plus the bytes written since (None = never scanned)
+    _approx_bytes = None
+    _writes_since_scan = 0
+
     @staticmethod
     def _hash_key(key: str) -> str:
         """Generate MD5 hash for the key to avoid filename collisions."""
         return hashlib.md5(key.encode("utf-8")).hexdigest()
 
     @staticmethod
-    def get(key: str) -> Optional[Any]:
+    def _find(hashed: str):
+        for codec in CODECS:
+            path = CACHE_DIR / f"{hashed}{codec.suffix}"
+            if path.exists():
+                return codec, path
+        return None, None
+
+    @staticmethod
+    def _remove(path: Path) -> int:
+        """Delete a file, tolerating concurrent removal. Returns the bytes freed."""
+        try:
+            size = path.stat().st_size
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _drop(hashed: str) -> None:
+        for codec in CODECS:
+            DiskCache._remove(CACHE_DIR / f"{hashed}{codec.suffix}")
+        DiskCache._remove(CACHE_DIR / f"{hashed}{META_SUFFIX}")
+
+    @staticmethod
+    def _expired(hashed: str, now: float) -> bool:
+        try:
+            meta = json.loads((CACHE_DIR / f"{hashed}{META_SUFFIX}").read_text())
+        except (OSError, ValueError):
+            return False  # entries written before metadata existed never expire
+        expires = meta.get("expires")
+        return expires is not None and expires <= now
+
+    @staticmethod
+    def _find_live(key: str):
+        """L1 entry for `key`, dropping it if expired, else read through from L2."""
         hashed = DiskCache._hash_key(key)
-        path = CACHE_DIR / f"{hashed}.pkl"
-        if not path.exists():
+        codec, path = DiskCache._find(hashed)
+        if path is not None and DiskCache._expired(hashed, time.time()):
+            DiskCache._drop(hashed)
+            DiskCache._counters["expired"] += 1
+            codec, path = None, None
+        if path is None and S3Tier.enabled():
+            fetched = S3Tier.fetch(hashed)
+            DiskCache._counters["l2_hits" if fetched else "l2_misses"] += 1
+            if fetched:
+                suffix, tmp, meta = fetched
+                codec = next(c for c in CODECS if c.suffix == suffix)
+                path = DiskCache._install(hashed, codec, tmp, dict(meta, key=key))
+        return codec, path
+
+    @staticmethod
+    def _lookup(key: str):
+        """Resolve a live entry: counts the miss, refreshes LRU order on hit."""
+        codec, path = DiskCache._find_live(key)
+        if path is None:
+            DiskCache._counters["misses"] += 1
+            return None, None
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted by another worker meanwhile
+            DiskCache._counters["misses"] += 1
+            return None, None
+        return codec, path
+
+    @staticmethod
+    def has(key: str) -> bool:
+        """True if a live (not expired) entry exists, without loading it. Reads through L2."""
+        return DiskCache._find_live(key)[1] is not None
+
+    @staticmethod
+    def _hit(path: Path) -> None:
+        DiskCache._counters["hits"] += 1
+        try:
+            DiskCache._counters["bytes_read"] += path.stat().st_size
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def get(key: str) -> Optional[Any]:
+        codec, path = DiskCache._lookup(key)
+        if path is None:
             return None
         try:
-            with open(path, "rb") as f:
-                # print(f"DEBUG: Cache hit for {key} -> {hashed}")
-                return pickle.load(f)
+            value = codec.load(path)
         except Exception as e:
             print(f"Cache read error for {key}: {e}")
+            DiskCache._counters["errors"] += 1
             return None
+        DiskCache._hit(path)
+        return value
 
     @staticmethod
-    def set(key: str, value: Any) -> None:
-        hashed = DiskCache._hash_key(key)
-        path = CACHE_DIR / f"{hashed}.pkl"
+    def get_roads(keys: Union[str, List[str]], bbox=None, road_filter: str = "all") -> Optional[RoadNetwork]:
+        """
+        Load cached street graph(s) as one packed RoadNetwork, skipping the
+        NetworkX rebuild when entries are columnar. Several keys (e.g. tiles)
+        are merged and pruned with `road_filter`; returns None unless every
+        key is cached.
+        """
+        keys = [keys] if isinstance(keys, str) else keys
+        found = [DiskCache._lookup(key) for key in keys]
+        if any(path is None for _, path in found):
+            return None
         try:
-            with open(path, "wb") as f:
-                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
-                # print(f"DEBUG: Cache saved for {key} -> {hashed}")
+            if pa is None:
+                G = prune_graph(nx.compose_all([codec.load(path) for codec, path in found]), road_filter)
+                roads = RoadNetwork.from_graph(G) if len(G) else None
+            else:
+                tables = [codec.read_table(path) if hasattr(codec, "read_table") else GraphArrowCodec.to_table(codec.load(path))
+                          for codec, path in found]
+                roads = GraphArrowCodec.roads_from_tables(tables, bbox=bbox, road_filter=road_filter)
         except Exception as e:
-            print(f"Cache write error for {key}: {e}")
+            print(f"Cache read error for {keys[0]}: {e}")
+            DiskCache._counters["errors"] += 1
+            return None
+        for _, path in found:
+            DiskCache._hit(path)
+        return roads
+
+    @staticmethod
+    def set(key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """
+        Store `value` under `key` for `ttl` seconds (CACHE_TTL by default,
+        0 = never expires), then evict least recently used entries if the
+        directory may be over budget (see _note_write).
+        """
+        hashed = DiskCache._hash_key(key)
+        ttl = CACHE_TTL if ttl is None else ttl
+        for codec in CODECS:
+            if not codec.accepts(value):
+                continue
+            # Readers never see a partial file: write aside, then rename over
+            tmp = CACHE_DIR / f"{hashed}{codec.suffix}.{uuid.uuid4().hex}{TMP_SUFFIX}"
+            try:
+                codec.dump(value, tmp)
+            except Exception as e:
+                # e.g. mixed-type tag columns Arrow cannot store: try the next codec
+                print(f"Cache write error for {key} ({codec.__name__}): {e}")
+                DiskCache._remove(tmp)
+                continue
+
+            now = time.time()
+            meta = {"key": key, "created": now, "expires": now + ttl if ttl else None}
+            path = DiskCache._install(hashed, codec, tmp, meta)
+            size = path.stat().st_size
+            DiskCache._counters["writes"] += 1
+            DiskCache._counters["bytes_written"] += size
+            S3Tier.put(hashed, path, meta)
+            DiskCache._note_write(size)
+            return
+
+    @staticmethod
+    def _note_write(size: int) -> None:
+        """
+        Keep a running size total so a write does not scan the directory:
+        eviction (a full scan) runs only once the total crosses the budget,
+        on the first write of the process, or every CACHE_RESCAN_WRITES.
+        """
+        if CACHE_MAX_BYTES <= 0:
+            return
+        DiskCache._writes_since_scan += 1
+        if DiskCache._approx_bytes is not None and DiskCache._writes_since_scan < CACHE_RESCAN_WRITES:
+            DiskCache._approx_bytes += size
+            if DiskCache._approx_bytes <= CACHE_MAX_BYTES:
+                return
+        DiskCache.evict()
+
+    @staticmethod
+    def _install(hashed: str, codec, tmp: Path, meta: Dict[str, Any]) -> Path:
+        """Move a fully written temp file into place along with its metadata."""
+        path = CACHE_DIR / f"{hashed}{codec.suffix}"
+        meta_tmp = CACHE_DIR / f"{hashed}{META_SUFFIX}.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        meta_tmp.write_text(json.dumps(meta))
+        os.replace(meta_tmp, CACHE_DIR / f"{hashed}{META_SUFFIX}")
+        os.replace(tmp, path)
+
+        # Drop a stale entry written in another format
+        for other in CODECS:
+            if other is not codec:
+                DiskCache._remove(CACHE_DIR / f"{hashed}{other.suffix}")
+        return path
+
+    @staticmethod
+    def flush() -> None:
+        """Wait until pending L2 uploads are done."""
+        S3Tier.flush()
+
+    @staticmethod
+    def _entries():
+        """Scan the directory: {hash: [size, last_access, data_path]}. Also clears stale temp files."""
+        entries = {}
+        now = time.time()
+        with os.scandir(CACHE_DIR) as it:
+            for f in it:
+                try:
+                    if not f.is_file():
+                        continue
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+                if f.name.endswith(TMP_SUFFIX):
+                    # Leftover of a crashed writer
+                    if now - st.st_mtime > 3600:
+                        DiskCache._remove(Path(f.path))
+                    continue
+                hashed, _, suffix = f.name.partition(".")
+                entry = entries.setdefault(hashed, [0, 0.0, None])
+                entry[0] += st.st_size
+                if f".{suffix}" != META_SUFFIX:
+                    entry[1] = st.st_mtime
+                    entry[2] = Path(f.path)
+        return entries
+
+    @staticmethod
+    def evict(max_bytes: Optional[int] = None) -> int:
+        """
+        Bring the cache under its byte budget: least recently used entries go
+        first, down to CACHE_LOW_WATERMARK of the budget (expired entries are
+        dropped when read). One directory scan, no metadata reads.
+        Returns the number of entries removed.
+        """
+        max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        if max_bytes <= 0:
+            return 0
+        entries = DiskCache._entries()
+        total = sum(size for size, _, _ in entries.values())
+        removed = 0
+        if total > max_bytes:
+            target = max_bytes * CACHE_LOW_WATERMARK
+            for hashed in sorted(entries, key=lambda h: entries[h][1]):
+                if total <= target:
+                    break
+                DiskCache._drop(hashed)
+                total -= entries[hashed][0]
+                removed += 1
+            DiskCache._counters["evictions"] += removed
+        DiskCache._approx_bytes = total
+        DiskCache._writes_since_scan = 0
+        return removed
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Hit/miss/byte counters of this process plus current directory usage."""
+        entries = DiskCache._entries()
+        counters = DiskCache._counters
+        lookups = counters["hits"] + counters["misses"]
+        stats = {name: counters[name] for name in
+                 ("hits", "misses", "expired", "errors", "writes", "bytes_read", "bytes_written", "evictions",
+                  "l2_hits", "l2_misses", "l2_uploads", "l2_bytes_uploaded")}
+        stats.update({
+            "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+            "entries": sum(1 for _, _, path in entries.values() if path is not None),
+            "bytes": sum(size for size, _, _ in entries.values()),
+            "max_bytes": CACHE_MAX_BYTES,
+        })
+        return stats
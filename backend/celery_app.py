@@ -1,6 +1,9 @@
 import os
+import redis
 import sentry_sdk
 from celery import Celery
+from celery.schedules import crontab
+from backend.routing import LIGHT_QUEUE, PRIORITY_STEPS, PRIORITY_SEP
 
 # Sentry Init for Worker
 if os.getenv("SENTRY_DSN"):
@@ -13,11 +16,14 @@ if os.getenv("SENTRY_DSN"):
 # Get Redis URL from env or default to localhost for local dev
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
+# Local hour of the nightly cache warm-up (backend.warmup), run by `celery beat`
+WARMUP_HOUR = int(os.getenv("WARMUP_HOUR", "4"))
+
 celery_app = Celery(
     "maptoposter",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["backend.tasks"]
+    include=["backend.tasks", "backend.warmup"]
 )
 
 # Optional: Configuration tuning
@@ -27,4 +33,32 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="Europe/Paris",
     enable_utc=True,
+    # Preview / light / heavy queues chosen from the estimated job cost (see backend.routing)
+    task_routes=("backend.routing.route_task",),
+    task_default_queue=LIGHT_QUEUE,
+    # Redis has no native priorities: one list per level, 0 served first
+    broker_transport_options={
+        "priority_steps": list(range(PRIORITY_STEPS)),
+        "sep": PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    },
+    # One task at a time per worker process: a long print job must not hold
+    # queued previews in its prefetch buffer
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "nightly-warmup": {
+            "task": "backend.warmup.warmup_task",
+            "schedule": crontab(hour=WARMUP_HOUR, minute=0),
+        },
+    },
 )
+
+
+_redis_client = None
+
+def get_redis_client() -> redis.Redis:
+    """Shared Redis connection (the broker instance) for locks and small shared state."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=5)
+    return _redis_client
@@ -1,75 +1,229 @@
 import asyncio
-import osmnx as ox
+import threading
+import networkx as nx
+import pandas as pd
+import geopandas as gpd
+from osmnx._errors import InsufficientResponseError
 from typing import Dict, List, Optional, Any
 from backend.cache import DiskCache
+from backend.locks import single_flight
 from backend.models import CustomLayer
+from backend.roads import RoadNetwork, prune_graph
+from backend.sources import get_source
+from backend.projection import (utm_crs, project_roads, project_polygons, project_features,
+                                clip_roads, clip_features)
+from backend.tiles import (TILE_DEG, request_bbox, tiles_for_bbox, covering_bbox,
+                           split_graph, merge_graphs, split_features, merge_features)
 
 class MapDataFetcher:
     """
-    Handles fetching geospatial data from OpenStreetMap via OSMnx.
+    Handles fetching geospatial data from OpenStreetMap via OSMnx, from
+    Overpass or a local extract (see backend.sources).
+
+    Raw OSM data is cached per tile of a fixed lat/lon grid (see backend.tiles):
+    a request only downloads the tiles it covers that are not cached yet, so
+    neighbouring and nested posters mostly reuse earlier downloads.
+
+    Feature layers (water, parks, custom layers) are downloaded together in a
+    single query with the merged tag filters, then split back per layer and
+    cached under each layer's own tile keys.
     """
     
+    WATER_TAGS = {'natural': 'water', 'waterway': 'riverbank'}
+    PARKS_TAGS = {'leisure': 'park', 'landuse': 'grass'}
+
     @staticmethod
-    def _fetch_graph_sync(point, dist):
-        key = f"graph_{point[0]}_{point[1]}_{dist}"
-        cached = DiskCache.get(key)
-        if cached:
-            return cached
-        
-        try:
-            # truncate_by_edge=True prevents edge artifacts at the boundary
-            G = ox.graph_from_point(point, dist=dist, dist_type='bbox', network_type='all', truncate_by_edge=True)
-            DiskCache.set(key, G)
-            return G
-        except Exception as e:
-            print(f"Error fetching graph: {e}")
-            return None
+    def graph_key(point, dist, road_filter="all") -> str:
+        suffix = "" if road_filter == "all" else f"_{road_filter}"
+        return f"graph_{point[0]}_{point[1]}_{dist}{suffix}"
 
     @staticmethod
-    def _fetch_features_sync(point, dist, tags, name):
+    def features_key(point, dist, tags, name) -> str:
         # Create a deterministic key based on tags
         tag_str = "-".join([f"{k}:{v}" for k,v in sorted(tags.items())])
-        key = f"feat_{name}_{point[0]}_{point[1]}_{dist}_{tag_str}"
-        
-        cached = DiskCache.get(key)
-        if cached is not None:
-            return cached
-            
-        try:
-            feats = ox.features_from_point(point, tags=tags, dist=dist)
-            if feats.empty:
-                return None
-            DiskCache.set(key, feats)
-            return feats
-        except Exception as e:
-            print(f"Error fetching features {name}: {e}")
+        return f"feat_{name}_{point[0]}_{point[1]}_{dist}_{tag_str}"
+
+    @staticmethod
+    def graph_tile_key(tile) -> str:
+        return f"graph_tile_{TILE_DEG}_{tile[0]}_{tile[1]}{get_source().key}"
+
+    @staticmethod
+    def features_tile_key(tile, tags) -> str:
+        tag_str = "-".join([f"{k}:{v}" for k,v in sorted(tags.items())])
+        return f"feat_tile_{TILE_DEG}_{tile[0]}_{tile[1]}_{tag_str}{get_source().key}"
+
+    @classmethod
+    def _ensure_graph_tiles(cls, tiles) -> bool:
+        """Download the street graph of uncached tiles in one query. False if the download failed."""
+        missing = [t for t in tiles if not DiskCache.has(cls.graph_tile_key(t))]
+        if not missing:
+            return True
+
+        # Concurrent requests for the same tiles wait for one download and reuse it
+        with single_flight(cls.graph_tile_key(t) for t in missing):
+            missing = [t for t in missing if not DiskCache.has(cls.graph_tile_key(t))]
+            if not missing:
+                return True
+            try:
+                G = get_source().graph_from_bbox(covering_bbox(missing))
+            except InsufficientResponseError:
+                G = nx.MultiDiGraph(crs="epsg:4326")  # no streets there: remember the tiles as empty
+            except Exception as e:
+                print(f"Error fetching graph: {e}")
+                return False
+            for tile, part in split_graph(G, missing).items():
+                DiskCache.set(cls.graph_tile_key(tile), part)
+            # Waiters on other nodes look in the shared tier once the lock is released
+            DiskCache.flush()
+        return True
+
+    @classmethod
+    def _fetch_graph_sync(cls, point, dist, road_filter="all"):
+        """Street graph of the request, pruned with `road_filter` from the full cached tiles."""
+        bbox = request_bbox(point, dist)
+        tiles = tiles_for_bbox(bbox)
+        if not cls._ensure_graph_tiles(tiles):
+            return None
+        graphs = [DiskCache.get(cls.graph_tile_key(t)) for t in tiles]
+        if any(G is None for G in graphs):
             return None
+        G = prune_graph(merge_graphs(graphs, bbox), road_filter)
+        return G if len(G) else None
 
     @classmethod
-    async def fetch_all(cls, lat: float, lon: float, dist: float, custom_layers: List[CustomLayer] = None) -> Dict[str, Any]:
+    def _fetch_roads_sync(cls, point, dist, road_filter="all"):
+        """Street network packed as a (lat/lon) RoadNetwork, merged column-wise from the cached tiles when possible."""
+        bbox = request_bbox(point, dist)
+        tiles = tiles_for_bbox(bbox)
+        if not cls._ensure_graph_tiles(tiles):
+            return None
+        roads = DiskCache.get_roads([cls.graph_tile_key(t) for t in tiles], bbox=bbox, road_filter=road_filter)
+        if roads is not None:
+            return roads if len(roads) else None
+        G = cls._fetch_graph_sync(point, dist, road_filter)
+        return RoadNetwork.from_graph(G) if G else None
+
+    @staticmethod
+    def merge_tags(tag_sets: List[Dict]) -> Dict:
+        """Union of OSMnx tag filters: `True` (any value) wins, values are pooled."""
+        merged = {}
+        for tags in tag_sets:
+            for key, value in tags.items():
+                if value is True or merged.get(key) is True:
+                    merged[key] = True
+                    continue
+                values = merged.setdefault(key, [])
+                for v in (value if isinstance(value, list) else [value]):
+                    if v not in values:
+                        values.append(v)
+        return merged
+
+    @staticmethod
+    def match_tags(feats: gpd.GeoDataFrame, tags: Dict) -> gpd.GeoDataFrame:
+        """Rows of a combined download matching one layer's tags, without the other layers' empty columns."""
+        mask = pd.Series(False, index=feats.index)
+        for key, value in tags.items():
+            if key not in feats.columns:
+                continue
+            if value is True:
+                mask |= feats[key].notna()
+            else:
+                mask |= feats[key].isin(value if isinstance(value, list) else [value])
+        part = feats[mask]
+        geometry = part.geometry.name
+        return part[[c for c in part.columns if c == geometry or part[c].notna().any()]]
+
+    @classmethod
+    def _ensure_feature_tiles(cls, bbox, layers: Dict[str, Dict]) -> bool:
         """
-        Fetches all required map data in parallel.
+        Download the uncached tiles of several feature layers (name -> tags)
+        in one query with the merged tags, and cache each layer's share under
+        its own tile keys. False if the download failed.
         """
-        point = (lat, lon)
-        
-        # Define tasks
-        tasks = {
-            "graph": asyncio.to_thread(cls._fetch_graph_sync, point, dist),
-            "water": asyncio.to_thread(cls._fetch_features_sync, point, dist, {'natural': 'water', 'waterway': 'riverbank'}, "water"),
-            "parks": asyncio.to_thread(cls._fetch_features_sync, point, dist, {'leisure': 'park', 'landuse': 'grass'}, "parks")
-        }
-        
-        # Add custom layers tasks
-        if custom_layers:
-            for i, layer in enumerate(custom_layers):
-                if layer.enabled and layer.tags:
-                    tasks[f"custom_{i}"] = asyncio.to_thread(
-                        cls._fetch_features_sync, point, dist, layer.tags, f"custom_{layer.label}"
-                    )
+        tiles = tiles_for_bbox(bbox)
+        keys = {(name, t): cls.features_tile_key(t, tags) for name, tags in layers.items() for t in tiles}
+        missing = [nt for nt, key in keys.items() if not DiskCache.has(key)]
+        if not missing:
+            return True
+
+        with single_flight(keys[nt] for nt in missing):
+            missing = [nt for nt in missing if not DiskCache.has(keys[nt])]
+            if not missing:
+                return True
+            names = list(dict.fromkeys(name for name, _ in missing))
+            area = sorted({t for _, t in missing})
+            try:
+                feats = get_source().features_from_bbox(covering_bbox(area),
+                                                        cls.merge_tags([layers[n] for n in names]))
+            except InsufficientResponseError:
+                feats = gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+            except Exception as e:
+                print(f"Error fetching features {', '.join(names)}: {e}")
+                return False
+            for name in names:
+                layer_tiles = [t for n, t in missing if n == name]
+                for tile, part in split_features(cls.match_tags(feats, layers[name]), layer_tiles).items():
+                    DiskCache.set(keys[(name, tile)], part)
+            DiskCache.flush()
+        return True
+
+    @classmethod
+    def _features_once(cls, point, dist, layers: Dict[str, Dict]):
+        """Callable running the combined feature download on its first call only (layers fetched in parallel share it)."""
+        lock = threading.Lock()
+        done = []
 
+        def ensure():
+            with lock:
+                if not done:
+                    cls._ensure_feature_tiles(request_bbox(point, dist), layers)
+                    done.append(True)
+        return ensure
+
+    @classmethod
+    def _fetch_features_sync(cls, point, dist, tags, name, prefetch=None):
+        if prefetch is not None:
+            prefetch()
+        bbox = request_bbox(point, dist)
+        keys = {t: cls.features_tile_key(t, tags) for t in tiles_for_bbox(bbox)}
+        parts = {t: DiskCache.get(key) for t, key in keys.items()}
+
+        missing = [t for t, part in parts.items() if part is None]
+        if missing:
+            with single_flight(keys[t] for t in missing):
+                for tile in missing:
+                    parts[tile] = DiskCache.get(keys[tile])
+                missing = [t for t in missing if parts[t] is None]
+                if missing:
+                    try:
+                        feats = get_source().features_from_bbox(covering_bbox(missing), tags)
+                    except InsufficientResponseError:
+                        feats = gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+                    except Exception as e:
+                        print(f"Error fetching features {name}: {e}")
+                        return None
+                    for tile, part in split_features(feats, missing).items():
+                        DiskCache.set(keys[tile], part)
+                        parts[tile] = part
+                    DiskCache.flush()
+
+        feats = merge_features(list(parts.values()), bbox)
+        return None if feats.empty else feats
+
+    @classmethod
+    def feature_layers(cls, custom_layers: List[CustomLayer] = None) -> Dict[str, tuple]:
+        """Result key -> (tags, cache name) of every feature layer of a request."""
+        layers = {"water": (cls.WATER_TAGS, "water"), "parks": (cls.PARKS_TAGS, "parks")}
+        for i, custom in enumerate(custom_layers or []):
+            if custom.enabled and custom.tags:
+                layers[f"custom_{i}"] = (custom.tags, f"custom_{custom.label}")
+        return layers
+
+    @staticmethod
+    async def _gather(tasks: Dict[str, Any]) -> Dict[str, Any]:
         # Run all in parallel
         results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-        
+
         # Map results back to keys
         data = {}
         keys = list(tasks.keys())
@@ -79,5 +233,68 @@ class MapDataFetcher:
                 data[k] = None
             else:
                 data[k] = res
-                
+
+        return data
+
+    @staticmethod
+    def viewport_key(bbox) -> str:
+        return "_".join(f"{v:.5f}" for v in bbox)
+
+    @staticmethod
+    def _fetch_projected_sync(source_key, crs, fetch, project):
+        """
+        Second cache tier: render-ready projected layer keyed by the raw
+        layer's cache key plus the target CRS (and viewport when clipped). On
+        a hit the raw data is not even loaded; on a miss it is fetched (raw
+        tier), projected and stored.
+        """
+        key = f"proj_{source_key}_{crs}"
+        cached = DiskCache.get(key)
+        if cached is not None:
+            return cached
+
+        raw = fetch()
+        if raw is None:
+            return None
+        projected = project(raw, crs)
+        if projected is not None:
+            DiskCache.set(key, projected)
+        return projected
+
+    @classmethod
+    async def fetch_projected(cls, lat: float, lon: float, dist: float, custom_layers: List[CustomLayer] = None,
+                              bbox=None, road_filter: str = "all") -> Dict[str, Any]:
+        """
+        Fetches all map data already projected to the poster CRS, in the
+        format expected by MapRenderer.prepare (see projection.project_data).
+        With a lon/lat `bbox` (projection.viewport_lonlat), layers are clipped
+        to the visible area before projection. Streets are pruned with
+        `road_filter` (roads.road_filter_for).
+        """
+        point = (lat, lon)
+        crs = utm_crs(point)
+
+        def layer(source_key, fetch, project, clip):
+            if bbox is not None:
+                source_key = f"{source_key}_{cls.viewport_key(bbox)}"
+                fetch = lambda fetch=fetch: clip(fetch(), bbox)
+            return asyncio.to_thread(cls._fetch_projected_sync, source_key, crs, fetch, project)
+
+        tasks = {
+            "roads": layer(cls.graph_key(point, dist, road_filter), lambda: cls._fetch_roads_sync(point, dist, road_filter),
+                           project_roads, clip_roads),
+        }
+
+        # Layers missing from the projected tier share one raw download
+        layers = cls.feature_layers(custom_layers)
+        prefetch = cls._features_once(point, dist, {k: tags for k, (tags, _) in layers.items()})
+        for k, (tags, name) in layers.items():
+            tasks[k] = layer(
+                cls.features_key(point, dist, tags, name),
+                lambda tags=tags, name=name: cls._fetch_features_sync(point, dist, tags, name, prefetch),
+                project_polygons if k in ("water", "parks") else project_features, clip_features,
+            )
+
+        data = await cls._gather(tasks)
+        data['crs'] = crs
         return data
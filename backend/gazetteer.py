@@ -0,0 +1,182 @@
+"""
+Offline gazetteer: cities above a population threshold (GeoNames, CC BY 4.0)
+packed into a small gzipped TSV and looked up in memory before Nominatim.
+
+Build the bundled file (the Docker image does it at build time):
+
+    python -m backend.gazetteer build [cities15000.txt countryInfo.txt] [-o data/gazetteer.tsv.gz]
+
+Without input files, the GeoNames dumps are downloaded.
+"""
+import argparse
+import gzip
+import io
+import os
+import unicodedata
+import urllib.request
+import zipfile
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+GAZETTEER_PATH = Path(os.getenv("GAZETTEER_PATH", "data/gazetteer.tsv.gz"))
+MIN_POPULATION = 15000
+
+GEONAMES_CITIES_URL = "https://download.geonames.org/export/dump/cities15000.zip"
+GEONAMES_COUNTRIES_URL = "https://download.geonames.org/export/dump/countryInfo.txt"
+
+# Common country spellings that differ from the GeoNames names
+COUNTRY_ALIASES = {
+    "usa": "US", "us": "US", "united states of america": "US", "etats-unis": "US",
+    "uk": "GB", "great britain": "GB", "england": "GB", "scotland": "GB", "wales": "GB",
+    "royaume-uni": "GB", "allemagne": "DE", "espagne": "ES", "italie": "IT",
+    "belgique": "BE", "suisse": "CH", "pays-bas": "NL", "japon": "JP", "chine": "CN",
+}
+
+
+def normalize_name(value: str) -> str:
+    """Accent-, case- and whitespace-insensitive form used as index key."""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(value.casefold().replace("-", " ").split())
+
+
+class Gazetteer:
+    """
+    Sorted-array index of (name, country code) keys: a lookup is two binary
+    searches, and homonyms within a country resolve to the most populated.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, float, float, int]], countries: Dict[str, str]):
+        rows = sorted(rows)
+        self.keys: List[Tuple[str, str]] = [(name, cc) for name, cc, *_ in rows]
+        self.coords = np.array([(lat, lon) for _, _, lat, lon, _ in rows], dtype=np.float64).reshape(-1, 2)
+        self.population = np.array([pop for *_, pop in rows], dtype=np.int64)
+        self.countries = {normalize_name(k): v for k, v in COUNTRY_ALIASES.items()}
+        self.countries.update(countries)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def country_code(self, country: str) -> Optional[str]:
+        key = normalize_name(country)
+        if key in self.countries:
+            return self.countries[key]
+        return key.upper() if len(key) == 2 else None
+
+    def lookup(self, city: str, country: str) -> Optional[Tuple[float, float]]:
+        """(lat, lon) of the most populated `city` in `country`, or None."""
+        cc = self.country_code(country)
+        if cc is None:
+            return None
+        key = (normalize_name(city), cc)
+        lo = bisect_left(self.keys, key)
+        hi = bisect_right(self.keys, key)
+        if lo == hi:
+            return None
+        best = lo + int(np.argmax(self.population[lo:hi]))
+        lat, lon = self.coords[best]
+        return float(lat), float(lon)
+
+    @classmethod
+    def load(cls, path: Path = None) -> "Gazetteer":
+        rows, countries = [], {}
+        with gzip.open(path or GAZETTEER_PATH, "rt", encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if fields[0] == "#country":
+                    countries[fields[1]] = fields[2]
+                else:
+                    name, cc, lat, lon, pop = fields
+                    rows.append((name, cc, float(lat), float(lon), int(pop)))
+        return cls(rows, countries)
+
+
+_index = None
+
+
+def lookup(city: str, country: str) -> Optional[Tuple[float, float]]:
+    """Module-level lookup on the bundled index (loaded once; None if it is missing)."""
+    global _index
+    if _index is None:
+        try:
+            _index = Gazetteer.load()
+        except OSError as e:
+            print(f"Offline gazetteer unavailable ({e}), geocoding online only")
+            _index = Gazetteer([], {})
+    return _index.lookup(city, country)
+
+
+def _geonames_cities(lines: Iterable[str], min_population: int) -> Iterator[Tuple[str, str, float, float, int]]:
+    """Index rows from a GeoNames cities dump: one per distinct (name, ascii name)."""
+    for line in lines:
+        f = line.rstrip("\n").split("\t")
+        population = int(f[14] or 0)
+        if population < min_population:
+            continue
+        lat, lon = round(float(f[4]), 5), round(float(f[5]), 5)
+        for name in {normalize_name(f[1]), normalize_name(f[2])}:
+            if name:
+                yield name, f[8], lat, lon, population
+
+
+def _geonames_countries(lines: Iterable[str]) -> Dict[str, str]:
+    countries = {}
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        f = line.rstrip("\n").split("\t")
+        countries[normalize_name(f[4])] = f[0]
+        countries[normalize_name(f[1])] = f[0]  # ISO3
+    return countries
+
+
+def build(cities_lines: Iterable[str], country_lines: Iterable[str], out: Path,
+          min_population: int = MIN_POPULATION) -> int:
+    """Write the compact index file; returns the number of city keys."""
+    rows = sorted(set(_geonames_cities(cities_lines, min_population)))
+    countries = _geonames_countries(country_lines)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(out, "wt", encoding="utf-8", compresslevel=9) as f:
+        for name, cc in sorted(countries.items()):
+            f.write(f"#country\t{name}\t{cc}\n")
+        for name, cc, lat, lon, pop in rows:
+            f.write(f"{name}\t{cc}\t{lat}\t{lon}\t{pop}\n")
+    return len(rows)
+
+
+def _download_lines(url: str) -> List[str]:
+    with urllib.request.urlopen(url, timeout=120) as resp:
+        data = resp.read()
+    if url.endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            data = zf.read(zf.namelist()[0])
+    return data.decode("utf-8").splitlines()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.gazetteer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="build the offline index from GeoNames dumps")
+    b.add_argument("cities", nargs="?", help="GeoNames cities dump (default: download cities15000)")
+    b.add_argument("countries", nargs="?", help="GeoNames countryInfo.txt (default: download)")
+    b.add_argument("-o", "--output", type=Path, default=GAZETTEER_PATH)
+    b.add_argument("--min-population", type=int, default=MIN_POPULATION)
+    args = parser.parse_args(argv)
+
+    if args.cities:
+        cities = Path(args.cities).read_text(encoding="utf-8").splitlines()
+    else:
+        cities = _download_lines(GEONAMES_CITIES_URL)
+    if args.countries:
+        countries = Path(args.countries).read_text(encoding="utf-8").splitlines()
+    else:
+        countries = _download_lines(GEONAMES_COUNTRIES_URL)
+    count = build(cities, countries, args.output, args.min_population)
+    print(f"Wrote {count} city keys to {args.output} ({args.output.stat().st_size / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import redis
+import redis.asyncio as aioredis
+
+from backend.celery_app import REDIS_URL
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "MapPoster/2.0 (Backend Proxy)"
+
+# Cached searches: lifetime (seconds, memory and Redis) and in-process LRU size
+GEOCODE_TTL = int(os.getenv("GEOCODE_TTL", str(7 * 24 * 3600)))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "4096"))
+
+# After a Redis failure, use the in-process cache only for this long
+_RETRY_AFTER = 60
+
+
+class GeocodeError(Exception):
+    """Nominatim answered with an error status."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Nominatim error {status_code}")
+        self.status_code = status_code
+
+
+def normalize_query(q: str) -> str:
+    """Case, width and whitespace variants of a search share one cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", q).casefold().split())
+
+
+class NominatimProxy:
+    """
+    Nominatim search for the API's typeahead: one pooled HTTP client for the
+    app lifetime, an in-process LRU in front of a Redis cache shared by all
+    API processes, and a single upstream request for identical concurrent
+    queries.
+    """
+
+    def __init__(self, client: httpx.AsyncClient = None, ttl: int = None, max_entries: int = None):
+        self._client = client
+        self.ttl = ttl or GEOCODE_TTL
+        self.max_entries = max_entries or GEOCODE_CACHE_SIZE
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._redis = None
+        self._redis_down_until = 0.0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT}, timeout=10,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+        return self._client
+
+    def _shared(self) -> Optional[aioredis.Redis]:
+        if time.time() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+        return self._redis
+
+    def _redis_failed(self, e: Exception):
+        print(f"Geocode Redis cache disabled for {_RETRY_AFTER}s: {e}")
+        self._redis_down_until = time.time() + _RETRY_AFTER
+
+    def _remember(self, key: str, results: List[Dict[str, Any]]):
+        self._memory[key] = (time.time() + self.ttl, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires, results = entry
+        if time.time() > expires:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return results
+
+    async def search(self, q: str) -> List[Dict[str, Any]]:
+        """Best Nominatim match for `q` (JSON list, at most one item)."""
+        key = normalize_query(q)
+        results = self._recall(key)
+        if results is not None:
+            return results
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A caller that goes away (client disconnect) must not cancel the others' request
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str) -> List[Dict[str, Any]]:
+        redis_key = f"geocode:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+        shared = self._shared()
+        if shared is not None:
+            try:
+                cached = await shared.get(redis_key)
+                if cached is not None:
+                    results = json.loads(cached)
+                    self._remember(key, results)
+                    return results
+            except redis.RedisError as e:
+                self._redis_failed(e)
+                shared = None
+
+        resp = await self._http().get(NOMINATIM_URL, params={"format": "json", "q": key, "limit": 1})
+        if resp.status_code != 200:
+            raise GeocodeError(resp.status_code)
+        results = resp.json()
+        self._remember(key, results)
+
+        if shared is not None:
+            try:
+                await shared.set(redis_key, json.dumps(results), ex=self.ttl)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return results
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
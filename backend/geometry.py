@@ -0,0 +1,67 @@
+import numpy as np
+import shapely
+from matplotlib.path import Path
+from typing import Any, List
+
+
+class PolygonSet:
+    """
+    Packed polygons ready for Matplotlib: one compound path per polygon part
+    (exterior + holes), stored as flat `vertices`/`codes` arrays delimited by
+    `offsets` (length P + 1).
+    """
+
+    def __init__(self, vertices: np.ndarray, codes: np.ndarray, offsets: np.ndarray, crs: Any = None):
+        self.vertices = vertices
+        self.codes = codes
+        self.offsets = offsets
+        self.crs = crs
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_geometries(cls, geoms, crs: Any = None) -> "PolygonSet":
+        """Pack (Multi)Polygons; other geometry types are ignored."""
+        geoms = np.asarray(geoms, dtype=object)
+        geoms = geoms[np.isin(shapely.get_type_id(geoms), (3, 6))]  # Polygon, MultiPolygon
+
+        # Matplotlib tells holes apart by winding order: CCW exteriors, CW holes
+        parts = shapely.orient_polygons(shapely.get_parts(geoms))
+        rings, ring_part = shapely.get_rings(parts, return_index=True)
+        return cls._pack(rings, ring_part, len(parts), crs)
+
+    @classmethod
+    def _pack(cls, rings, ring_part: np.ndarray, n_parts: int, crs: Any) -> "PolygonSet":
+        vertices, vertex_ring = shapely.get_coordinates(rings, return_index=True)
+
+        # Every ring starts with MOVETO and ends with CLOSEPOLY
+        codes = np.full(len(vertices), Path.LINETO, dtype=np.uint8)
+        ring_counts = np.bincount(vertex_ring, minlength=len(rings))
+        ring_ends = np.cumsum(ring_counts)
+        codes[ring_ends - ring_counts] = Path.MOVETO
+        codes[ring_ends - 1] = Path.CLOSEPOLY
+
+        part_counts = np.bincount(ring_part, weights=ring_counts, minlength=n_parts).astype(np.int64)
+        offsets = np.zeros(n_parts + 1, dtype=np.int64)
+        np.cumsum(part_counts, out=offsets[1:])
+        return cls(vertices, codes, offsets, crs=crs)
+
+    def simplify(self, tolerance: float) -> "PolygonSet":
+        """
+        Douglas-Peucker on every ring (CRS units). Rings smaller than the
+        tolerance collapse to a zero-area path that draws nothing.
+        """
+        if tolerance <= 0 or not len(self.vertices):
+            return self
+        starts = np.flatnonzero(self.codes == Path.MOVETO)
+        ring_counts = np.diff(np.append(starts, len(self.vertices)))
+        rings = shapely.linearrings(self.vertices, indices=np.repeat(np.arange(len(starts)), ring_counts))
+        ring_part = np.searchsorted(self.offsets, starts, side='right') - 1
+        rings = shapely.simplify(rings, tolerance, preserve_topology=False)
+        return self._pack(rings, ring_part, len(self), self.crs)
+
+    def paths(self) -> List[Path]:
+        """One Matplotlib Path per polygon part (views into the packed arrays)."""
+        o = self.offsets
+        return [Path(self.vertices[o[i]:o[i + 1]], self.codes[o[i]:o[i + 1]]) for i in range(len(self))]
@@ -0,0 +1,97 @@
+import os
+import time
+from typing import Callable
+
+import redis
+from celery.result import AsyncResult
+from celery.states import READY_STATES
+
+from backend.celery_app import get_redis_client
+from backend.progress import is_alive
+
+# How long a request hash keeps pointing at its task (queued, running or done)
+INFLIGHT_TTL = int(os.getenv("INFLIGHT_TTL", "3600"))
+
+# Placeholder held while the owner of a hash is enqueueing its task
+_CLAIMED = b"claimed"
+_CLAIM_WAIT = 2.0
+
+# After a Redis failure, enqueue without deduplication for this long
+_RETRY_AFTER = 60
+_unavailable_until = 0.0
+
+
+def _task_state(task_id: str) -> str:
+    return AsyncResult(task_id).state
+
+
+def _reusable(task_id: str) -> bool:
+    """
+    Queued, running and finished tasks can be shared; failed or revoked ones
+    are retried, and so are running ones whose heartbeat stopped (their
+    worker died). Queued messages survive a worker crash in the broker.
+    """
+    try:
+        state = _task_state(task_id)
+        if state in ("FAILURE", "REVOKED"):
+            return False
+        if state in READY_STATES or state == "PENDING":
+            return True
+        return is_alive(task_id)
+    except Exception:
+        return True
+
+
+def submit_once(request_hash: str, submit: Callable[[], str]) -> str:
+    """
+    Return the id of the task already queued, running or finished for
+    `request_hash`, or call `submit()` (which enqueues and returns a new task
+    id) if there is none. Concurrent callers race on a Redis SET NX, so
+    identical requests arriving together share one task.
+
+    Without Redis, every call submits.
+    """
+    global _unavailable_until
+    if time.time() < _unavailable_until:
+        return submit()
+
+    key = f"inflight:{request_hash}"
+    try:
+        client = get_redis_client()
+        deadline = time.monotonic() + _CLAIM_WAIT
+        while True:
+            if client.set(key, _CLAIMED, nx=True, ex=INFLIGHT_TTL):
+                break
+            current = client.get(key)
+            if current is None:
+                continue  # expired or released meanwhile
+            if current == _CLAIMED:
+                if time.monotonic() < deadline:
+                    time.sleep(0.02)
+                    continue
+                # The owner did not finish enqueueing in time: take over
+                client.set(key, _CLAIMED, ex=INFLIGHT_TTL)
+                break
+            task_id = current.decode()
+            if _reusable(task_id):
+                return task_id
+            # Failed task: let this request start a fresh one
+            client.delete(key)
+    except redis.RedisError as e:
+        print(f"Request deduplication disabled for {_RETRY_AFTER}s: {e}")
+        _unavailable_until = time.time() + _RETRY_AFTER
+        return submit()
+
+    try:
+        task_id = submit()
+    except Exception:
+        try:
+            client.delete(key)
+        except redis.RedisError:
+            pass
+        raise
+    try:
+        client.set(key, task_id, ex=INFLIGHT_TTL)
+    except redis.RedisError as e:
+        print(f"Could not record in-flight task {task_id}: {e}")
+    return task_id
@@ -0,0 +1,54 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable
+
+import redis
+
+from backend.celery_app import get_redis_client
+
+# Lock auto-expiry (a crashed worker never blocks a key for longer) and max wait, in seconds
+FETCH_LOCK_TTL = int(os.getenv("FETCH_LOCK_TTL", "600"))
+
+# After a Redis failure, run unlocked for this long instead of retrying on every fetch
+_RETRY_AFTER = 60
+_unavailable_until = 0.0
+
+
+def _locks_client():
+    return None if time.time() < _unavailable_until else get_redis_client()
+
+
+@contextmanager
+def single_flight(keys: Iterable[str], ttl: int = None):
+    """
+    Hold a cross-process Redis lock on every cache key in `keys` (acquired in
+    sorted order so overlapping requests cannot deadlock). Callers re-check
+    the cache once inside: whoever got the lock first has usually filled it.
+
+    Without Redis, or after waiting `ttl` seconds, the block runs unlocked.
+    """
+    global _unavailable_until
+    ttl = ttl or FETCH_LOCK_TTL
+    held = []
+    client = _locks_client()
+    try:
+        if client is not None:
+            for key in sorted(set(keys)):
+                lock = client.lock(f"lock:{key}", timeout=ttl, blocking_timeout=ttl)
+                if not lock.acquire():
+                    print(f"Timed out waiting for {key}, fetching anyway")
+                    continue
+                held.append(lock)
+    except redis.RedisError as e:
+        print(f"Fetch locks disabled for {_RETRY_AFTER}s: {e}")
+        _unavailable_until = time.time() + _RETRY_AFTER
+
+    try:
+        yield
+    finally:
+        for lock in reversed(held):
+            try:
+                lock.release()
+            except redis.RedisError:
+                pass  # expired meanwhile
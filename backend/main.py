@@ -1,10 +1,13 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from celery.result import AsyncResult
 from typing import Dict, Any
 
 from backend.models import PosterRequest
-from backend.tasks import generate_poster_task
+from backend.progress import ProgressHub
+from backend.geocode import NominatimProxy, GeocodeError
+from backend.tasks import generate_poster_task, cache_stats_task, normalize_request, request_hash
 
 import os
 import sentry_sdk
@@ -22,8 +25,19 @@ if os.getenv("SENTRY_DSN"):
         profiles_sample_rate=1.0,
     )
 
+# Per client IP; previews are cheap and requested while editing, print jobs are not
+GENERATE_RATE_LIMIT = os.getenv("GENERATE_RATE_LIMIT", "5/minute")
+PREVIEW_RATE_LIMIT = os.getenv("PREVIEW_RATE_LIMIT", "30/minute")
+
 limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="MapPoster Generator API (Async)")
+geocoder = NominatimProxy()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await geocoder.aclose()
+
+app = FastAPI(title="MapPoster Generator API (Async)", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
@@ -37,16 +51,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def _enqueue(body: PosterRequest) -> Dict[str, str]:
+    """Enqueue unless an identical request is already queued, running or done (its task is returned)."""
+    import asyncio
+    from backend.inflight import submit_once
+
+    # Convert model to dict for Celery
+    def submit():
+        return generate_poster_task.delay(body.model_dump()).id
+
+    task_id = await asyncio.to_thread(submit_once, request_hash(normalize_request(body)), submit)
+    return {"task_id": task_id}
+
 @app.post("/generate")
-@limiter.limit("5/minute")
+@limiter.limit(GENERATE_RATE_LIMIT)
 async def generate_poster_endpoint(request: Request, body: PosterRequest):
     """
-    Enqueue a poster generation task.
+    Enqueue a poster generation task, unless an identical request is already
+    queued, running or done: its task is returned instead.
     Returns: {"task_id": "..."}
     """
-    # Convert model to dict for Celery
-    task = generate_poster_task.delay(body.model_dump())
-    return {"task_id": task.id}
+    return await _enqueue(body)
+
+@app.post("/preview")
+@limiter.limit(PREVIEW_RATE_LIMIT)
+async def preview_poster_endpoint(request: Request, body: PosterRequest):
+    """
+    Enqueue a low-DPI preview of the poster (served by the preview queue),
+    with its own, higher rate limit than full print jobs.
+    Returns: {"task_id": "..."}
+    """
+    return await _enqueue(body.model_copy(update={"preview": True}))
 
 @app.get("/themes")
 async def get_themes():
@@ -77,11 +112,7 @@ async def get_themes():
                 pass
     return {"themes": themes}
 
-@app.get("/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    """
-    Get the status of a generation task.
-    """
+def _task_status(task_id: str) -> Dict[str, Any]:
     task_result = AsyncResult(task_id)
     
     response = {
@@ -110,6 +141,53 @@ async def get_task_status(task_id: str):
         
     return response
 
+@app.get("/tasks/{task_id}")
+async def get_task_status(task_id: str):
+    """
+    Get the status of a generation task.
+    """
+    return _task_status(task_id)
+
+# Keep-alive comment interval on idle event streams (seconds)
+EVENTS_KEEPALIVE = 15
+
+progress_hub = ProgressHub()
+
+@app.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    Server-sent events: the task status (same payload as /tasks/{id}) on
+    connect, then every update pushed by the worker until it succeeds or fails.
+    """
+    import asyncio
+    import json
+    from fastapi.responses import StreamingResponse
+
+    async def events():
+        queue = await progress_hub.subscribe(task_id)
+        try:
+            # The subscription is confirmed before the snapshot, so nothing published
+            # after it is missed (if Redis was slow to confirm, the resync below catches up)
+            event = await asyncio.to_thread(_task_status, task_id)
+            yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            while event["status"] not in ("SUCCESS", "FAILURE"):
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Quiet for a while: resync from the result backend in
+                    # case an update was lost (e.g. Redis reconnecting)
+                    latest = await asyncio.to_thread(_task_status, task_id)
+                    if latest == event:
+                        yield ": keep-alive\n\n"
+                        continue
+                    event = latest
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+        finally:
+            progress_hub.unsubscribe(task_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/download/{task_id}")
 async def download_task_result(task_id: str):
     """
@@ -124,37 +202,72 @@ async def download_task_result(task_id: str):
     
     raise HTTPException(status_code=404, detail="Result not ready or not found")
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Disk cache usage and counters, as seen by one worker.
+    """
+    import asyncio
+    try:
+        result = cache_stats_task.delay()
+        return await asyncio.to_thread(result.get, timeout=10)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"No worker answered: {e}")
+
+@app.get("/queues")
+async def get_queues():
+    """
+    Pending jobs per queue and priority (Redis broker), and the workers
+    consuming each queue with their pool size, to size each worker pool.
+    """
+    import asyncio
+    from backend.celery_app import celery_app, get_redis_client
+    from backend.routing import queue_depths
+
+    try:
+        queues = await asyncio.to_thread(queue_depths, get_redis_client())
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Broker unavailable: {e}")
+
+    def _workers():
+        inspect = celery_app.control.inspect(timeout=1.0)
+        return inspect.active_queues() or {}, inspect.stats() or {}
+
+    active_queues, stats = await asyncio.to_thread(_workers)
+    for info in queues.values():
+        info["workers"] = 0
+        info["concurrency"] = 0
+    for worker, consumed in active_queues.items():
+        concurrency = stats.get(worker, {}).get("pool", {}).get("max-concurrency", 0)
+        for q in consumed:
+            if q["name"] in queues:
+                queues[q["name"]]["workers"] += 1
+                queues[q["name"]]["concurrency"] += concurrency
+    return {"queues": queues}
+
 # Legacy Stream Endpoint (Removed/Deprecated)
 # The frontend must migrate to polling /tasks/{id}
 
-import httpx
-
 @app.get("/geocode")
 async def geocode_proxy(q: str):
     """
     Proxy to Nominatim to bypass CORS/User-Agent browser restrictions.
+    Results are cached (memory + Redis) and identical concurrent queries share one request.
     """
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "format": "json",
-        "q": q,
-        "limit": 1
-    }
-    headers = {
-        "User-Agent": "MapPoster/2.0 (Backend Proxy)"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params, headers=headers)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail="Nominatim error")
-        return resp.json()
+    import httpx
+    try:
+        return await geocoder.search(q)
+    except GeocodeError as e:
+        raise HTTPException(status_code=e.status_code, detail="Nominatim error")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Nominatim unreachable: {e}")
 @app.get("/history")
 async def get_history(request: Request, limit: int = 10):
     """
     List recent generated posters from S3.
     """
-    from backend.tasks import get_s3_client, build_public_url, S3_BUCKET
+    from backend.storage import get_s3_client, build_public_url, S3_BUCKET, S3_PUBLIC_URL
+    from backend.tasks import PREVIEW_PREFIX
     s3 = get_s3_client()
     base_url = S3_PUBLIC_URL.rstrip("/")
     if base_url.startswith("/"):
@@ -168,8 +281,9 @@ async def get_history(request: Request, limit: int = 10):
         if 'Contents' not in resp:
             return []
             
-        # Sort by LastModified desc
-        objects = sorted(resp['Contents'], key=lambda x: x['LastModified'], reverse=True)
+        # Sort by LastModified desc (previews are not part of the history)
+        objects = [o for o in resp['Contents'] if not o['Key'].startswith(PREVIEW_PREFIX)]
+        objects = sorted(objects, key=lambda x: x['LastModified'], reverse=True)
         
         history = []
         for obj in objects[:limit]:
@@ -34,3 +34,6 @@ class PosterRequest(BaseModel):
     dpi: int = 300
     margins: float = 0.0 # inches
     paper_size: str = "custom" # metadata
+
+    # Quick low-DPI PNG of the selected style, to check framing and colors
+    preview: bool = False
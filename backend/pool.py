@@ -0,0 +1,90 @@
+import logging
+import os
+import queue
+import tempfile
+from typing import Dict, Any, Iterator, Tuple
+
+import billiard
+
+from backend.cache import DiskCache
+from backend.renderer import PreparedScene
+from backend.raster import save_figure
+
+logger = logging.getLogger(__name__)
+
+# Number of processes used to rasterize themes in all_themes mode (0 = one per CPU)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Scene inherited by forked pool workers (never pickled)
+_SCENE = None
+
+
+def _rasterize(scene: PreparedScene, theme_id: str, theme: Dict[str, Any], fmt: str, dpi: int) -> Tuple[str, str]:
+    """Apply one theme and print it to a temporary file. Returns (theme_id, path)."""
+    scene.apply_theme(theme)
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix=f"{theme_id}_")
+    with os.fdopen(fd, "wb") as f:
+        save_figure(scene.fig, f, fmt, dpi, theme['bg'])
+    return theme_id, path
+
+
+def _init_worker(scene: PreparedScene):
+    global _SCENE
+    _SCENE = scene
+
+
+def _rasterize_inherited(theme_id: str, theme: Dict[str, Any], fmt: str, dpi: int) -> Tuple[str, str]:
+    return _rasterize(_SCENE, theme_id, theme, fmt, dpi)
+
+
+def render_themes(scene: PreparedScene, themes: Dict[str, Dict[str, Any]], fmt: str, dpi: int,
+                  workers: int = None) -> Iterator[Tuple[str, str]]:
+    """
+    Rasterize `scene` once per theme, yielding (theme_id, path) as each file is
+    ready (completion order). The caller owns and must delete the files.
+
+    Themes are fanned out to forked processes that inherit the prepared scene
+    copy-on-write, so the projected data is never pickled. The pool comes from
+    billiard (Celery's multiprocessing fork), which unlike multiprocessing lets
+    the daemonic prefork workers have children. Falls back to sequential
+    rendering when fork is unavailable or workers <= 1.
+    """
+    workers = min(workers or RENDER_WORKERS, len(themes))
+    pool = None
+    if workers > 1 and "fork" in billiard.get_all_start_methods():
+        # Children would inherit the locks held by in-flight cache upload
+        # threads (but not the threads): let the uploads finish first
+        DiskCache.flush()
+        try:
+            pool = billiard.get_context("fork").Pool(workers, initializer=_init_worker, initargs=(scene,))
+        except OSError as e:
+            logger.warning("Process pool unavailable, rendering themes sequentially: %s", e)
+
+    if pool is None:
+        for theme_id, theme in themes.items():
+            yield _rasterize(scene, theme_id, theme, fmt, dpi)
+        return
+
+    # Indexes of the jobs as they finish, successfully or not
+    finished = queue.Queue()
+    jobs = [pool.apply_async(_rasterize_inherited, (theme_id, theme, fmt, dpi),
+                             callback=lambda _, i=i: finished.put(i),
+                             error_callback=lambda _, i=i: finished.put(i))
+            for i, (theme_id, theme) in enumerate(themes.items())]
+    delivered = set()
+    try:
+        for _ in jobs:
+            i = finished.get()
+            result = jobs[i].get()
+            delivered.add(i)
+            yield result
+        pool.close()
+    finally:
+        # Early exit or error: drop the themes still queued or running
+        if len(delivered) < len(jobs):
+            pool.terminate()
+        pool.join()
+        # Remove files the caller never received
+        for i, job in enumerate(jobs):
+            if i not in delivered and job.ready() and job.successful():
+                os.remove(job.get()[1])
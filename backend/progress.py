@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from celery import Task
+from celery.states import READY_STATES
+
+from backend.celery_app import REDIS_URL, get_redis_client
+
+# Pub/sub channel of a task's status events (same payload as GET /tasks/{id})
+CHANNEL_PREFIX = "progress:"
+
+# A running task counts as alive while it reported progress this recently (seconds);
+# a killed worker leaves its task in PROGRESS forever
+HEARTBEAT_TTL = int(os.getenv("TASK_HEARTBEAT_TTL", "900"))
+HEARTBEAT_PREFIX = "heartbeat:"
+
+# Longest wait for Redis to confirm the subscription before a stream starts anyway
+SUBSCRIBE_TIMEOUT = 2.0
+
+
+def publish(task_id: str, event: Dict[str, Any]) -> None:
+    """Best effort: pollers still see the state in the result backend."""
+    try:
+        get_redis_client().publish(f"{CHANNEL_PREFIX}{task_id}", json.dumps({"task_id": task_id, **event}))
+    except redis.RedisError as e:
+        print(f"Progress publish failed for {task_id}: {e}")
+
+
+def heartbeat(task_id: str) -> None:
+    try:
+        get_redis_client().set(f"{HEARTBEAT_PREFIX}{task_id}", b"1", ex=HEARTBEAT_TTL)
+    except redis.RedisError as e:
+        print(f"Heartbeat failed for {task_id}: {e}")
+
+
+def is_alive(task_id: str) -> bool:
+    """Whether a started task reported progress within HEARTBEAT_TTL."""
+    return bool(get_redis_client().exists(f"{HEARTBEAT_PREFIX}{task_id}"))
+
+
+class ProgressTask(Task):
+    """
+    Celery task base that also publishes every progress update and the
+    final outcome, for the streaming endpoint (GET /tasks/{id}/events), and
+    refreshes the task's heartbeat on each update (see is_alive).
+    """
+
+    def update_state(self, task_id=None, state=None, meta=None, **kwargs):
+        super().update_state(task_id=task_id, state=state, meta=meta, **kwargs)
+        task_id = task_id or self.request.id
+        # Final events come from on_success/on_failure, once the result is stored
+        if task_id and state not in READY_STATES:
+            heartbeat(task_id)
+            publish(task_id, {"status": state, "progress": meta, "result": None, "error": None})
+
+    def on_success(self, retval, task_id, args, kwargs):
+        publish(task_id, {"status": "SUCCESS", "result": retval, "error": None,
+                          "progress": {"current": 100, "total": 100, "status": "Completed"}})
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        publish(task_id, {"status": "FAILURE", "result": None, "error": str(exc)})
+
+
+class ProgressHub:
+    """
+    API side: one pattern subscription for the whole process, fanned out to
+    an asyncio queue per connected client. Hundreds of streams then cost a
+    single Redis connection.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        self.url = url
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        # Set while Redis has confirmed the pattern subscription
+        self._subscribed = asyncio.Event()
+
+    async def subscribe(self, task_id: str) -> asyncio.Queue:
+        """
+        Queue of the task's events, returned once the subscription is live:
+        anything published afterwards reaches it. If Redis does not confirm
+        within SUBSCRIBE_TIMEOUT, the queue is returned anyway.
+        """
+        queue = asyncio.Queue()
+        self._listeners.setdefault(task_id, set()).add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=SUBSCRIBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Progress subscription not confirmed, streaming {task_id} anyway")
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        listeners = self._listeners.get(task_id)
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[task_id]
+
+    async def _read(self):
+        """Dispatch messages while anyone listens; reconnect after Redis errors."""
+        while self._listeners:
+            client = aioredis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                while self._listeners:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["type"] == "psubscribe":
+                        self._subscribed.set()
+                        continue
+                    if message["type"] != "pmessage":
+                        continue
+                    task_id = message["channel"].decode()[len(CHANNEL_PREFIX):]
+                    event = json.loads(message["data"])
+                    for queue in self._listeners.get(task_id, ()):
+                        queue.put_nowait(event)
+            except redis.RedisError as e:
+                print(f"Progress subscription lost, retrying: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._subscribed.clear()
+                await pubsub.aclose()
+                await client.aclose()
@@ -0,0 +1,122 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import Transformer
+from typing import Dict, Any, List, Optional, Tuple
+from backend.geometry import PolygonSet
+from backend.models import CustomLayer
+from backend.roads import RoadNetwork
+
+POLYGON_LAYERS = ("water", "parks")
+
+# Extra room kept around the viewport when clipping, as a fraction of its size
+CLIP_PADDING = 0.02
+
+BBox = Tuple[float, float, float, float]
+
+
+def utm_crs(point: Tuple[float, float]) -> str:
+    """UTM zone CRS containing the (lat, lon) point, shared by every layer of a poster."""
+    lat, lon = point
+    zone = int((lon + 180) // 6) % 60 + 1
+    return f"EPSG:{(32600 if lat >= 0 else 32700) + zone}"
+
+
+def project_point(point: Tuple[float, float], crs: str) -> Tuple[float, float]:
+    lat, lon = point
+    return Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform(lon, lat)
+
+
+def viewport(point: Tuple[float, float], dist: float, width_in: float, height_in: float,
+             crs: str) -> BBox:
+    """
+    Visible rectangle (xmin, ymin, xmax, ymax) of a poster in `crs`: `dist`
+    metres around the point along the long side, the short side following
+    the poster aspect ratio.
+    """
+    cx, cy = project_point(point, crs)
+    aspect = width_in / height_in
+    half_x = dist
+    half_y = dist
+    if aspect > 1: half_y = half_x / aspect
+    else: half_x = half_y * aspect
+    return cx - half_x, cy - half_y, cx + half_x, cy + half_y
+
+
+def viewport_lonlat(point: Tuple[float, float], dist: float, width_in: float, height_in: float) -> BBox:
+    """Lon/lat rectangle (west, south, east, north) enclosing the padded poster viewport."""
+    crs = utm_crs(point)
+    xmin, ymin, xmax, ymax = viewport(point, dist, width_in, height_in, crs)
+    pad_x, pad_y = (xmax - xmin) * CLIP_PADDING, (ymax - ymin) * CLIP_PADDING
+    return Transformer.from_crs(crs, "EPSG:4326", always_xy=True).transform_bounds(
+        xmin - pad_x, ymin - pad_y, xmax + pad_x, ymax + pad_y, densify_pts=21)
+
+
+def clip_roads(G, bbox: BBox) -> Optional[RoadNetwork]:
+    """Pack the raw graph (unless already packed) and drop the edges outside the lon/lat `bbox`."""
+    if G is None:
+        return None
+    roads = G if isinstance(G, RoadNetwork) else RoadNetwork.from_graph(G)
+    return roads.clip(bbox)
+
+
+def clip_features(gdf: Optional[gpd.GeoDataFrame], bbox: BBox) -> Optional[gpd.GeoDataFrame]:
+    """
+    Keep the features meeting the lon/lat `bbox` (spatial index query) and cut
+    them to it, so large polygons (sea, forests) only keep their visible part.
+    """
+    if gdf is None or gdf.empty:
+        return gdf
+    hits = gdf.sindex.query(shapely.box(*bbox), predicate='intersects')
+    geoms = shapely.clip_by_rect(gdf.geometry.values[np.sort(hits)], *bbox)
+    geoms = geoms[~shapely.is_empty(geoms)]
+    return gpd.GeoDataFrame(geometry=gpd.GeoSeries(geoms, crs=gdf.crs))
+
+
+def project_roads(G, crs: str) -> RoadNetwork:
+    """Pack the raw lat/lon graph (unless already packed), then reproject its vertices."""
+    roads = G if isinstance(G, RoadNetwork) else RoadNetwork.from_graph(G)
+    if roads.crs is None:
+        roads.crs = "EPSG:4326"
+    return roads.to_crs(crs)
+
+
+def project_polygons(gdf: Optional[gpd.GeoDataFrame], crs: str) -> Optional[PolygonSet]:
+    """Keep (Multi)Polygons only, reproject and pack them for drawing."""
+    if gdf is None or gdf.empty:
+        return None
+    geoms = gdf.geometry
+    geoms = geoms[geoms.geom_type.isin(['Polygon', 'MultiPolygon'])]
+    if geoms.empty:
+        return None
+    return PolygonSet.from_geometries(geoms.to_crs(crs).values, crs=crs)
+
+
+def project_features(gdf: Optional[gpd.GeoDataFrame], crs: str) -> Optional[gpd.GeoSeries]:
+    """Reproject a custom layer, keeping every geometry type (lines, points, polygons)."""
+    if gdf is None or gdf.empty:
+        return None
+    return gdf.geometry.to_crs(crs)
+
+
+def project_data(data: Dict[str, Any], point: Tuple[float, float],
+                 custom_layers: List[CustomLayer] = None, bbox: BBox = None) -> Dict[str, Any]:
+    """
+    Project the raw fetcher output into one metric CRS, render-ready:
+    `roads` (RoadNetwork), `water`/`parks` (PolygonSet) and `custom_{i}` (GeoSeries).
+    With a lon/lat `bbox` (see viewport_lonlat), layers are clipped to it first.
+    """
+    G = data.get('graph')
+    if not G:
+        raise ValueError("Graph data missing")
+
+    def clip(layer, clipper):
+        return layer if bbox is None else clipper(layer, bbox)
+
+    crs = utm_crs(point)
+    projected = {'crs': crs, 'roads': project_roads(clip(G, clip_roads), crs)}
+    for name in POLYGON_LAYERS:
+        projected[name] = project_polygons(clip(data.get(name), clip_features), crs)
+    for i, _ in enumerate(custom_layers or []):
+        projected[f"custom_{i}"] = project_features(clip(data.get(f"custom_{i}"), clip_features), crs)
+    return projected
@@ -0,0 +1,144 @@
+import os
+import zlib
+import struct
+from typing import BinaryIO
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.backends.backend_pdf import FigureCanvasPdf
+
+# PNG outputs above this many pixels are rasterized in horizontal bands
+TILED_RENDER_PIXELS = int(os.getenv("TILED_RENDER_PIXELS", str(64_000_000)))
+# Pixels per band (the Agg buffer holds 4 bytes per pixel)
+RENDER_BAND_PIXELS = int(os.getenv("RENDER_BAND_PIXELS", str(16_000_000)))
+
+
+def _canvas(fig, fmt: str):
+    if fmt == 'svg': return FigureCanvasSVG(fig)
+    if fmt == 'pdf': return FigureCanvasPdf(fig)
+    return FigureCanvasAgg(fig)
+
+
+def save_figure(fig: Figure, out: BinaryIO, fmt: str, dpi: int, facecolor) -> None:
+    """
+    Encode `fig` into `out`. Large PNGs go through write_png_bands so the
+    Agg buffer never holds the whole poster.
+    """
+    width, height = fig.get_size_inches() * dpi
+    if fmt == 'png' and width * height > TILED_RENDER_PIXELS:
+        write_png_bands(fig, out, dpi, facecolor)
+    else:
+        _canvas(fig, fmt).print_figure(out, format=fmt, dpi=dpi, facecolor=facecolor)
+
+
+def _chunk(out: BinaryIO, tag: bytes, data: bytes) -> None:
+    out.write(struct.pack(">I", len(data)))
+    out.write(tag)
+    out.write(data)
+    out.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+
+# Bytes of pixels filtered per numpy pass: small enough for the int16 temporaries to stay in cache
+_FILTER_BYTES = 1 << 18
+
+
+def _paeth_scanlines(rows: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """
+    PNG scanlines (filter byte + filtered bytes) using the Paeth filter on
+    RGBA rows; `previous` is the raw row above the first one.
+    """
+    x = rows.astype(np.int16)
+    b = np.empty_like(x)                                 # above
+    b[0] = previous
+    b[1:] = x[:-1]
+    a = np.zeros_like(x)                                 # left
+    a[:, 4:] = x[:, :-4]
+    c = np.zeros_like(x)                                 # above-left
+    c[:, 4:] = b[:, :-4]
+
+    pa = b - c
+    pb = a - c
+    pc = pa + pb
+    np.abs(pa, out=pa)
+    np.abs(pb, out=pb)
+    np.abs(pc, out=pc)
+    # Nearest of a, b, c to a + b - c, ties resolved in that order
+    predictor = np.where(pb <= pc, b, c)
+    np.copyto(predictor, a, where=(pa <= pb) & (pa <= pc))
+    x -= predictor
+
+    scanlines = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 0] = 4
+    scanlines[:, 1:] = x
+    return scanlines
+
+
+def write_png_bands(fig: Figure, out: BinaryIO, dpi: int, facecolor, band_pixels: int = None) -> None:
+    """
+    Rasterize `fig` one horizontal band at a time and stream the rows into an
+    RGBA PNG, so peak memory is proportional to the band, not the poster.
+
+    For each band the figure is resized to the band height and every axes is
+    moved by the band offset (pixel exact), keeping its data limits, so
+    artists in data or axes coordinates land exactly where a full render
+    puts them. Figure-level artists (fig.text, legends on the figure) are not
+    supported. The figure is restored afterwards.
+    """
+    width_in, height_in = fig.get_size_inches()
+    fig_w, fig_h = width_in * dpi, height_in * dpi
+    # Same truncation as the Agg canvas
+    width, height = int(fig_w), int(fig_h)
+    band = max(1, (band_pixels or RENDER_BAND_PIXELS) // width)
+    step = max(1, _FILTER_BYTES // (width * 4))
+
+    # Freeze each axes' active (post-aspect) box in full-figure display pixels
+    saved_dpi, saved_facecolor = fig.dpi, fig.get_facecolor()
+    fig.set_dpi(dpi)
+    saved = []
+    for ax in fig.axes:
+        ax.apply_aspect()
+        saved.append((ax, ax.get_position(original=True), ax.get_aspect(), ax.get_position().frozen()))
+    boxes = [(ax, Bbox(pos.get_points() * [fig_w, fig_h])) for ax, _, _, pos in saved]
+    for ax, _, _, _ in saved:
+        ax.set_aspect('auto')
+    fig.set_facecolor(facecolor)
+
+    out.write(b"\x89PNG\r\n\x1a\n")
+    _chunk(out, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+    ppm = int(round(dpi / 0.0254))
+    _chunk(out, b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+    compressor = zlib.compressobj(6)
+    previous = np.zeros(width * 4, dtype=np.uint8)  # raw row above the next one to filter
+    try:
+        for top in range(0, height, band):
+            rows = min(band, height - top)
+            # A hair taller than `rows` so Agg's int() truncation keeps exactly `rows`
+            band_h = rows + 1e-3
+            fig.set_size_inches(width_in, band_h / dpi, forward=False)
+            offset = height - top - rows  # display y of the band bottom in the full figure
+            for ax, box in boxes:
+                x0, y0, x1, y1 = box.extents
+                ax.set_position([x0 / fig_w, (y0 - offset) / band_h, (x1 - x0) / fig_w, (y1 - y0) / band_h])
+
+            canvas = FigureCanvasAgg(fig)
+            canvas.draw()
+            pixels = np.asarray(canvas.buffer_rgba())[:rows].reshape(rows, -1)
+            for start in range(0, rows, step):
+                chunk = pixels[start:start + step]
+                data = compressor.compress(_paeth_scanlines(chunk, previous).data)
+                if data:
+                    _chunk(out, b"IDAT", data)
+                previous = chunk[-1].copy()
+            del canvas, pixels
+        _chunk(out, b"IDAT", compressor.flush())
+        _chunk(out, b"IEND", b"")
+    finally:
+        fig.set_size_inches(width_in, height_in, forward=False)
+        fig.set_dpi(saved_dpi)
+        fig.set_facecolor(saved_facecolor)
+        for ax, original, aspect, _ in saved:
+            ax.set_position(original)
+            ax.set_aspect(aspect)
@@ -0,0 +1,305 @@
+import os
+import numpy as np
+import shapely
+import matplotlib.colors as mcolors
+from matplotlib.collections import LineCollection
+from pyproj import Transformer
+from typing import Dict, Any, List, Tuple
+
+# Road hierarchy, from most to least important.
+# Each entry: (theme key, fallback color, line width, OSM highway tags)
+ROAD_CLASSES = [
+    ("road_motorway", "#000", 1.2, ("motorway", "motorway_link")),
+    ("road_primary", "#111", 1.0, ("trunk", "trunk_link", "primary", "primary_link")),
+    ("road_secondary", "#222", 0.8, ("secondary", "secondary_link")),
+    ("road_tertiary", "#333", 0.6, ("tertiary", "tertiary_link")),
+    ("road_residential", "#444", 0.4, ("residential", "living_street")),
+    ("road_default", "#333", 0.4, ()),
+]
+
+DEFAULT_CLASS = len(ROAD_CLASSES) - 1
+
+# highway tag -> class index (anything not listed falls back to DEFAULT_CLASS)
+HIGHWAY_CLASS = {tag: i for i, (_, _, _, tags) in enumerate(ROAD_CLASSES) for tag in tags}
+
+ROAD_WIDTHS = np.array([width for _, _, width, _ in ROAD_CLASSES])
+
+# Paths, service roads and tracks (all drawn as road_default)
+MINOR_HIGHWAYS = frozenset({
+    "footway", "path", "cycleway", "steps", "pedestrian", "bridleway", "track", "service",
+    "corridor", "elevator", "platform", "busway", "construction", "proposed", "raceway",
+})
+
+# Street filters, from least to most pruned: name -> (last road class kept, highway tags dropped)
+ROAD_FILTERS = {
+    "all": (DEFAULT_CLASS, frozenset()),
+    "drive": (DEFAULT_CLASS, MINOR_HIGHWAYS),
+    "major": (HIGHWAY_CLASS["tertiary"], frozenset()),
+}
+
+# Above this radius (meters), minor streets are sub-pixel clutter: use the "drive" filter
+MINOR_ROADS_MAX_DIST = float(os.getenv("MINOR_ROADS_MAX_DIST", "15000"))
+
+
+def highway_class(highway, table: Dict[str, int] = HIGHWAY_CLASS) -> int:
+    """Map a raw OSM `highway` value (str or list) to a road class index."""
+    if isinstance(highway, list):
+        highway = highway[0] if highway else None
+    return table.get(highway, DEFAULT_CLASS)
+
+
+def keeps_highway(highway, road_filter: str) -> bool:
+    """Whether an edge with this raw `highway` value survives `road_filter`."""
+    if isinstance(highway, list):
+        highway = highway[0] if highway else None
+    last_class, dropped = ROAD_FILTERS[road_filter]
+    return highway not in dropped and HIGHWAY_CLASS.get(highway, DEFAULT_CLASS) <= last_class
+
+
+def road_filter_for(dist: float, themes: List[Dict[str, Any]] = ()) -> str:
+    """
+    Street filter for a poster radius. A theme may force one with a
+    `street_filter` key, the others get the radius default; several themes
+    share the least pruned of their filters.
+    """
+    default = "all" if dist <= MINOR_ROADS_MAX_DIST else "drive"
+    filters = [t["street_filter"] if t.get("street_filter") in ROAD_FILTERS else default for t in themes]
+    return min(filters, key=list(ROAD_FILTERS).index, default=default)
+
+
+def prune_graph(G, road_filter: str):
+    """View of a (full) street graph without the edges dropped by `road_filter`."""
+    if road_filter == "all":
+        return G
+    return G.edge_subgraph(
+        (u, v, k) for u, v, k, h in G.edges(keys=True, data='highway', default='unclassified')
+        if keeps_highway(h, road_filter)
+    )
+
+
+def classify_edges(G, table: Dict[str, int] = HIGHWAY_CLASS) -> np.ndarray:
+    """
+    Single pass over the graph edges returning a uint8 road class per edge,
+    in `G.edges` iteration order (for `ox.plot_graph` callers such as the CLI).
+    `table` maps highway tags to classes (HIGHWAY_CLASS by default).
+    """
+    highways = G.edges(data='highway', default='unclassified')
+    return np.fromiter(
+        (highway_class(h, table) for _, _, h in highways),
+        dtype=np.uint8,
+        count=G.number_of_edges(),
+    )
+
+
+def road_palette(theme: Dict[str, Any]) -> np.ndarray:
+    """RGBA color table indexed by road class for the given theme."""
+    return mcolors.to_rgba_array([theme.get(key, fallback) for key, fallback, _, _ in ROAD_CLASSES])
+
+
+def edge_colors(classes: np.ndarray, theme: Dict[str, Any]) -> np.ndarray:
+    """Per-edge RGBA colors by table lookup."""
+    return road_palette(theme)[classes]
+
+
+def edge_widths(classes: np.ndarray) -> np.ndarray:
+    """Per-edge line widths by table lookup."""
+    return ROAD_WIDTHS[classes]
+
+
+def edge_rows(u: np.ndarray, v: np.ndarray, key: np.ndarray) -> np.ndarray:
+    """(u, v, key) triplets as one opaque 24-byte value per edge, for set lookups."""
+    return np.ascontiguousarray(np.stack([u, v, key], axis=1)).view(np.dtype((np.void, 24))).ravel()
+
+
+class RoadNetwork:
+    """
+    Packed road geometries: every edge is a polyline whose vertices live in a
+    single (N, 2) `coords` array, delimited by `offsets` (length M + 1), with a
+    uint8 road class per edge.
+    """
+
+    def __init__(self, coords: np.ndarray, offsets: np.ndarray, classes: np.ndarray, crs: Any = None):
+        self.coords = coords
+        self.offsets = offsets
+        self.classes = classes
+        self.crs = crs
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    @classmethod
+    def from_graph(cls, G) -> "RoadNetwork":
+        """
+        Pack the edges of an OSMnx graph. Reverse duplicates of two-way streets
+        (v, u, k with the reversed geometry) are dropped.
+        """
+        xs = dict(G.nodes(data='x'))
+        ys = dict(G.nodes(data='y'))
+
+        us, vs, ks, classes, geoms = [], [], [], [], []
+        for u, v, k, data in G.edges(keys=True, data=True):
+            us.append(u)
+            vs.append(v)
+            ks.append(k)
+            classes.append(highway_class(data.get('highway', 'unclassified')))
+            geoms.append(data.get('geometry'))
+
+        start = np.array([(xs[u], ys[u]) for u in us], dtype=np.float64).reshape(-1, 2)
+        end = np.array([(xs[v], ys[v]) for v in vs], dtype=np.float64).reshape(-1, 2)
+        return cls.from_edges(
+            np.asarray(us, dtype=np.int64), np.asarray(vs, dtype=np.int64), np.asarray(ks, dtype=np.int64),
+            np.asarray(classes, dtype=np.uint8), start, end, geoms, crs=G.graph.get('crs'),
+        )
+
+    @classmethod
+    def from_edges(cls, u: np.ndarray, v: np.ndarray, key: np.ndarray, classes: np.ndarray,
+                   start: np.ndarray, end: np.ndarray, geoms, crs: Any = None) -> "RoadNetwork":
+        """
+        Vectorized constructor from edge columns: node ids `u`/`v`/`key`, uint8
+        classes, (M, 2) `start`/`end` node coordinates and per-edge geometries
+        (None for straight node-to-node edges).
+        """
+        geoms = np.asarray(geoms, dtype=object)
+        keep = ~cls._reverse_duplicates(u, v, key, classes, geoms)
+        geoms = geoms[keep]
+        classes, start, end = classes[keep], start[keep], end[keep]
+
+        m = len(geoms)
+        has_geom = np.fromiter((g is not None for g in geoms), dtype=bool, count=m)
+        with_geom = geoms[has_geom]
+
+        # Curved edges: all vertices in one vectorized call
+        geom_coords, geom_index = shapely.get_coordinates(with_geom, return_index=True)
+        geom_counts = np.bincount(geom_index, minlength=len(with_geom))
+
+        counts = np.full(m, 2, dtype=np.int64)
+        counts[has_geom] = geom_counts
+        offsets = np.zeros(m + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coords = np.empty((offsets[-1], 2), dtype=np.float64)
+
+        # Scatter curved vertices to their slots
+        starts = offsets[:-1][has_geom]
+        geom_starts = np.zeros(len(with_geom), dtype=np.int64)
+        np.cumsum(geom_counts[:-1], out=geom_starts[1:])
+        within = np.arange(len(geom_coords)) - np.repeat(geom_starts, geom_counts)
+        coords[np.repeat(starts, geom_counts) + within] = geom_coords
+
+        # Straight edges: node to node
+        straight = ~has_geom
+        first = offsets[:-1][straight]
+        coords[first] = start[straight]
+        coords[first + 1] = end[straight]
+
+        return cls(coords, offsets, np.ascontiguousarray(classes, dtype=np.uint8), crs=crs)
+
+    @staticmethod
+    def _reverse_duplicates(u: np.ndarray, v: np.ndarray, key: np.ndarray, classes: np.ndarray,
+                            geoms: np.ndarray) -> np.ndarray:
+        """
+        Mask of the (v, u, k) edges that retrace an (u, v, k) edge: same street
+        drawn twice. The key alone does not identify the way (two one-way ways
+        between the same nodes, parallel edges numbered differently in each
+        direction), so the class and the reversed geometry must match too.
+        """
+        rows = edge_rows(u, v, key)
+        order = np.argsort(rows)
+        candidates = np.flatnonzero((u > v) & np.isin(edge_rows(v, u, key), rows))
+        twins = order[np.searchsorted(rows[order], edge_rows(v, u, key)[candidates])]
+
+        mine, theirs = geoms[candidates], geoms[twins]
+        straight = np.fromiter((g is None for g in mine), dtype=bool, count=len(mine)) & \
+            np.fromiter((g is None for g in theirs), dtype=bool, count=len(theirs))
+        same = (straight | shapely.equals_exact(mine, shapely.reverse(theirs), tolerance=0)) & \
+            (classes[candidates] == classes[twins])
+
+        duplicate = np.zeros(len(u), dtype=bool)
+        duplicate[candidates[same]] = True
+        return duplicate
+
+    def simplify(self, tolerance: float) -> "RoadNetwork":
+        """
+        Douglas-Peucker on curved edges: vertices closer than `tolerance` (CRS
+        units) to the simplified line are dropped, end nodes always stay.
+        """
+        counts = np.diff(self.offsets)
+        curved = counts > 2
+        if tolerance <= 0 or not curved.any():
+            return self
+
+        edge_index = np.repeat(np.arange(len(self)), counts)
+        in_curved = curved[edge_index]
+        # linestrings() needs consecutive indices: renumber the curved edges 0..K-1
+        compact = np.cumsum(curved)[edge_index[in_curved]] - 1
+        lines = shapely.linestrings(self.coords[in_curved], indices=compact)
+        # Plain Douglas-Peucker: sub-pixel self-intersections are invisible, and
+        # topology preservation costs ~20x more
+        lines = shapely.simplify(lines, tolerance, preserve_topology=False)
+        line_coords, line_index = shapely.get_coordinates(lines, return_index=True)
+        line_counts = np.bincount(line_index, minlength=int(curved.sum()))
+
+        new_counts = counts.copy()
+        new_counts[curved] = line_counts
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(new_counts, out=offsets[1:])
+        coords = np.empty((offsets[-1], 2), dtype=self.coords.dtype)
+
+        # Straight edges keep their two vertices
+        src, dst = self.offsets[:-1][~curved], offsets[:-1][~curved]
+        coords[dst] = self.coords[src]
+        coords[dst + 1] = self.coords[src + 1]
+
+        # Simplified curved edges: scatter to their new slots
+        line_starts = np.cumsum(line_counts) - line_counts
+        within = np.arange(len(line_coords)) - np.repeat(line_starts, line_counts)
+        coords[np.repeat(offsets[:-1][curved], line_counts) + within] = line_coords
+        return RoadNetwork(coords, offsets, self.classes, crs=self.crs)
+
+    def clip(self, bbox: Tuple[float, float, float, float]) -> "RoadNetwork":
+        """
+        Keep the edges whose bounds meet `bbox` (xmin, ymin, xmax, ymax). Edges
+        are kept whole: Matplotlib clips them at the axes anyway.
+        """
+        if not len(self):
+            return self
+        xmin, ymin, xmax, ymax = bbox
+        starts = self.offsets[:-1]
+        x, y = self.coords[:, 0], self.coords[:, 1]
+        keep = ((np.maximum.reduceat(x, starts) >= xmin) & (np.minimum.reduceat(x, starts) <= xmax)
+                & (np.maximum.reduceat(y, starts) >= ymin) & (np.minimum.reduceat(y, starts) <= ymax))
+        if keep.all():
+            return self
+
+        counts = np.diff(self.offsets)
+        offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[keep], out=offsets[1:])
+        return RoadNetwork(self.coords[np.repeat(keep, counts)], offsets, self.classes[keep], crs=self.crs)
+
+    def to_crs(self, crs: Any) -> "RoadNetwork":
+        """Reproject all vertices in one vectorized transform (topology is unchanged)."""
+        transformer = Transformer.from_crs(self.crs, crs, always_xy=True)
+        x, y = transformer.transform(self.coords[:, 0], self.coords[:, 1])
+        return RoadNetwork(np.column_stack([x, y]), self.offsets, self.classes, crs=crs)
+
+    def lines(self, mask: np.ndarray = None) -> List[np.ndarray]:
+        """Per-edge vertex arrays (views into `coords`), optionally for a subset of edges."""
+        idx = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        return [self.coords[self.offsets[i]:self.offsets[i + 1]] for i in idx]
+
+
+def draw_roads(ax, roads: RoadNetwork, theme: Dict[str, Any], zorder: float = 1) -> List[LineCollection]:
+    """
+    Draw the road network with one LineCollection per road class.
+    Returns the collections (ordered like ROAD_CLASSES, empty classes skipped).
+    """
+    palette = road_palette(theme)
+    collections = []
+    for c in range(len(ROAD_CLASSES)):
+        mask = roads.classes == c
+        if not mask.any():
+            continue
+        lc = LineCollection(roads.lines(mask), colors=[palette[c]], linewidths=ROAD_WIDTHS[c], zorder=zorder)
+        lc.road_class = c
+        ax.add_collection(lc, autolim=False)
+        collections.append(lc)
+    return collections
@@ -0,0 +1,85 @@
+import math
+import os
+from typing import Any, Dict, Optional
+
+# Queue names. Previews get their own worker pool so they never wait behind
+# print jobs; other poster requests are split by estimated cost so that one
+# all_themes 600 DPI job cannot hold small single PNGs back.
+LIGHT_QUEUE = os.getenv("CELERY_LIGHT_QUEUE", "light")
+HEAVY_QUEUE = os.getenv("CELERY_HEAVY_QUEUE", "heavy")
+PREVIEW_QUEUE = os.getenv("CELERY_PREVIEW_QUEUE", "preview")
+QUEUES = (PREVIEW_QUEUE, LIGHT_QUEUE, HEAVY_QUEUE)
+
+# Jobs above this cost (see estimate_cost) go to HEAVY_QUEUE
+HEAVY_JOB_COST = float(os.getenv("HEAVY_JOB_COST", "150"))
+
+# Weight of one km² of map data (fetch, projection, drawing) against one output megapixel
+AREA_COST = 0.1
+
+# Redis priority levels: 0 is served first
+PRIORITY_STEPS = 10
+PRIORITY_SEP = ":"
+
+
+def _theme_count() -> int:
+    from backend.utils import list_themes
+    return max(len(list_themes()), 1)
+
+
+def estimate_cost(request_data: Dict[str, Any]) -> float:
+    """
+    Rough render cost of a poster request, in output megapixels: every theme
+    rasterizes the full poster and redraws all the geometry, whose volume
+    grows with the covered area and the number of custom layers.
+    """
+    dpi = request_data.get("dpi", 300)
+    megapixels = request_data.get("width", 12.0) * request_data.get("height", 16.0) * dpi * dpi / 1e6
+    area_km2 = (request_data.get("distance", 10000) / 1000) ** 2
+    layers = 1 + sum(1 for layer in request_data.get("custom_layers") or [] if layer.get("enabled", True))
+    themes = _theme_count() if request_data.get("all_themes") else 1
+    return themes * (megapixels + AREA_COST * area_km2 * layers)
+
+
+def priority_for(cost: float) -> int:
+    """Cheaper jobs first within a queue: one priority step per doubling of the cost."""
+    return min(PRIORITY_STEPS - 1, int(math.log2(1 + cost)))
+
+
+def route_task(name: str, args: tuple, kwargs: Dict[str, Any], options: Dict[str, Any],
+               task=None, **kw) -> Optional[Dict[str, Any]]:
+    """
+    Celery router (see celery_app `task_routes`), run by the caller at enqueue
+    time: previews go to PREVIEW_QUEUE, other poster requests to LIGHT_QUEUE
+    or HEAVY_QUEUE by estimated cost, with a matching priority. The nightly
+    warm-up runs on HEAVY_QUEUE behind every poster. Callers keep using
+    `.delay()`.
+    """
+    if name == "backend.warmup.warmup_task":
+        return {"queue": HEAVY_QUEUE, "priority": PRIORITY_STEPS - 1}
+    if name != "backend.tasks.generate_poster_task":
+        return None
+    request_data = args[0] if args else kwargs.get("request_data", {})
+    if request_data.get("preview"):
+        return {"queue": PREVIEW_QUEUE, "priority": 0}
+    cost = estimate_cost(request_data)
+    queue = HEAVY_QUEUE if cost > HEAVY_JOB_COST else LIGHT_QUEUE
+    return {"queue": queue, "priority": priority_for(cost)}
+
+
+def queue_depths(client) -> Dict[str, Dict[str, int]]:
+    """
+    Waiting messages per queue and priority, read from the Redis broker
+    (one list per queue and priority level, see celery_app).
+    """
+    depths = {}
+    for queue in QUEUES:
+        keys = [queue] + [f"{queue}{PRIORITY_SEP}{p}" for p in range(1, PRIORITY_STEPS)]
+        pipe = client.pipeline()
+        for key in keys:
+            pipe.llen(key)
+        counts = pipe.execute()
+        depths[queue] = {
+            "pending": sum(counts),
+            "by_priority": {str(p): n for p, n in enumerate(counts) if n},
+        }
+    return depths
@@ -0,0 +1,194 @@
+"""
+Where raw OSM data comes from. MapDataFetcher only asks a source for the
+street graph or the features of a lon/lat bbox; the tile cache sits above.
+
+- OverpassSource (default): live Overpass API queries through OSMnx.
+- ExtractSource: a local OSM extract (`OSM_EXTRACT=/data/region.osm.pbf`),
+  so production can run with no external calls and tests run offline.
+"""
+import bz2
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+import geopandas as gpd
+import networkx as nx
+import osmnx as ox
+from osmnx._errors import InsufficientResponseError
+from shapely.geometry import box
+
+BBox = Tuple[float, float, float, float]  # west, south, east, north
+
+# Local OSM extract (.osm.pbf with osmium-tool installed, or .osm / .osm.bz2 XML); empty = Overpass
+OSM_EXTRACT = os.getenv("OSM_EXTRACT", "")
+
+# Minimum delay (seconds) between two Overpass queries of this process; 0 = no pacing
+OVERPASS_MIN_INTERVAL = float(os.getenv("OVERPASS_MIN_INTERVAL", "0"))
+
+
+class OverpassSource:
+    """
+    Live Overpass API. Raises InsufficientResponseError when the bbox holds
+    nothing. Queries are spaced by at least `min_interval` seconds.
+    """
+
+    key = ""
+
+    def __init__(self, min_interval: float = None):
+        self.min_interval = OVERPASS_MIN_INTERVAL if min_interval is None else min_interval
+        self._next_query = 0.0
+        self._lock = threading.Lock()
+
+    def _pace(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_query)
+            self._next_query = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def paced(self, min_interval: float):
+        """Temporarily space queries by `min_interval` seconds (e.g. for a bulk warm-up)."""
+        previous, self.min_interval = self.min_interval, max(self.min_interval, min_interval)
+        try:
+            yield self
+        finally:
+            self.min_interval = previous
+
+    def graph_from_bbox(self, bbox: BBox) -> nx.MultiDiGraph:
+        self._pace()
+        # truncate_by_edge=True prevents edge artifacts at the boundary
+        return ox.graph_from_bbox(bbox, network_type='all', truncate_by_edge=True)
+
+    def features_from_bbox(self, bbox: BBox, tags: Dict) -> gpd.GeoDataFrame:
+        self._pace()
+        return ox.features_from_bbox(bbox, tags=tags)
+
+
+def cut_xml(src: Path, bbox: BBox, out: Path) -> None:
+    """
+    Streaming bbox cut of an OSM XML file (.osm / .osm.bz2), like
+    `osmium extract -s complete_ways`: the nodes inside, every way with a
+    node inside (with all its nodes) and the relations referencing them.
+    Two passes, memory bounded by the size of the slice.
+    """
+    west, south, east, north = bbox
+    opener = bz2.open if src.name.endswith(".bz2") else open
+    inside, needed, ways, relations = set(), set(), set(), set()
+
+    def elements(f):
+        """Top-level elements, complete; each is discarded once the caller is done with it."""
+        root = None
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if root is None:
+                root = el
+            elif event == "end" and el.tag in ("node", "way", "relation"):
+                yield el
+                root.clear()
+
+    with opener(src, "rb") as f:
+        for el in elements(f):
+            if el.tag == "node":
+                if west <= float(el.get("lon")) <= east and south <= float(el.get("lat")) <= north:
+                    inside.add(el.get("id"))
+            elif el.tag == "way":
+                refs = [nd.get("ref") for nd in el.iter("nd")]
+                if any(ref in inside for ref in refs):
+                    ways.add(el.get("id"))
+                    needed.update(refs)
+            elif any(m.get("ref") in (ways if m.get("type") == "way" else inside)
+                     for m in el.iter("member") if m.get("type") in ("way", "node")):
+                relations.add(el.get("id"))
+
+    keep = {"node": inside | needed, "way": ways, "relation": relations}
+    with opener(src, "rb") as f, open(out, "wb") as dst:
+        dst.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6" generator="maptoposter">\n')
+        for el in elements(f):
+            if el.get("id") in keep[el.tag]:
+                el.tail = "\n"
+                dst.write(ET.tostring(el))
+        dst.write(b"</osm>\n")
+
+
+class ExtractSource:
+    """
+    A local OSM extract queried by bbox. Each query first cuts its bbox out
+    of the extract into a temp file (`osmium extract` when osmium-tool is
+    installed, else a streaming XML reader) and parses that slice only:
+    nothing region-sized is ever held in memory. The last few slices are
+    kept, so the graph and the features of one area share a cut.
+
+    `.osm.pbf` extracts need osmium-tool.
+    """
+
+    def __init__(self, path, keep_slices: int = 4):
+        self.path = Path(path)
+        stat = self.path.stat()
+        # Tiles cached from different extracts (or versions) never mix
+        digest = hashlib.md5(f"{self.path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+        self.key = f"_x{digest[:8]}"
+        self.keep_slices = keep_slices
+        self._slices: "OrderedDict[BBox, Path]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dir = Path(tempfile.mkdtemp(prefix=f"osm_slices{self.key}_"))
+        weakref.finalize(self, shutil.rmtree, self._dir, True)
+
+    def _cut(self, bbox: BBox, out: Path) -> None:
+        if shutil.which("osmium"):
+            subprocess.run(["osmium", "extract", "-b", ",".join(map(str, bbox)), "-s", "complete_ways",
+                            "-f", "osm", "--overwrite", "-o", str(out), str(self.path)],
+                           check=True, capture_output=True)
+        elif ".pbf" in self.path.suffixes:
+            raise RuntimeError(f"Reading {self.path.name} needs osmium-tool (apt install osmium-tool), "
+                               "or convert it first: osmium cat extract.osm.pbf -o extract.osm")
+        else:
+            cut_xml(self.path, bbox, out)
+
+    def _slice(self, bbox: BBox) -> Path:
+        """Temp OSM XML file holding the bbox (cut once, reused while among the last few)."""
+        with self._lock:
+            path = self._slices.get(bbox)
+            if path is None:
+                path = self._dir / f"{'_'.join(f'{v:.6f}' for v in bbox)}.osm"
+                self._cut(bbox, path)
+                self._slices[bbox] = path
+                while len(self._slices) > self.keep_slices:
+                    self._slices.popitem(last=False)[1].unlink(missing_ok=True)
+            self._slices.move_to_end(bbox)
+            return path
+
+    def graph_from_bbox(self, bbox: BBox) -> nx.MultiDiGraph:
+        try:
+            G = ox.graph_from_xml(self._slice(bbox), retain_all=True)
+            G = ox.truncate.truncate_graph_bbox(G, bbox, truncate_by_edge=True)
+        except ValueError as e:
+            # Nothing of the extract inside the bbox
+            raise InsufficientResponseError(str(e)) from e
+        if not len(G):
+            raise InsufficientResponseError(f"No streets of {self.path.name} in {bbox}")
+        return G
+
+    def features_from_bbox(self, bbox: BBox, tags: Dict) -> gpd.GeoDataFrame:
+        return ox.features_from_xml(self._slice(bbox), polygon=box(*bbox), tags=tags)
+
+
+_source = None
+
+
+def get_source():
+    """Process-wide data source chosen by OSM_EXTRACT."""
+    global _source
+    if _source is None:
+        _source = ExtractSource(OSM_EXTRACT) if OSM_EXTRACT else OverpassSource()
+    return _source
@@ -0,0 +1,126 @@
+import io
+import os
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+
+# S3 Configuration
+S3_ENDPOINT = os.getenv("S3_ENDPOINT_URL", "http://minio:9000")
+S3_BUCKET = os.getenv("S3_BUCKET", "posters")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "/minio_storage")
+AWS_KEY = os.getenv("AWS_ACCESS_KEY_ID", "minioadmin")
+AWS_SECRET = os.getenv("AWS_SECRET_ACCESS_KEY", "minioadminpassword")
+
+def get_s3_client():
+    return boto3.client(
+        's3',
+        endpoint_url=S3_ENDPOINT,
+        aws_access_key_id=AWS_KEY,
+        aws_secret_access_key=AWS_SECRET
+    )
+
+def build_public_url(object_key: str) -> str:
+    base = S3_PUBLIC_URL.rstrip("/")
+    return f"{base}/{S3_BUCKET}/{object_key}"
+
+
+# Size of each multipart upload part (S3 requires at least 5 MiB except for the last one)
+S3_PART_SIZE = max(int(os.getenv("S3_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+
+
+class S3UploadStream(io.RawIOBase):
+    """
+    Write-only, non-seekable file object uploading to S3 while it is written.
+    Data is cut into S3_PART_SIZE parts sent as a multipart upload (at most
+    two in flight), so memory stays bounded whatever the output size; objects
+    smaller than one part go out as a single put_object on close.
+
+    Use it as a context manager: an exception aborts the upload.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, content_type: str = None, part_size: int = None):
+        super().__init__()
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.extra = {'ContentType': content_type} if content_type else {}
+        self.part_size = part_size or S3_PART_SIZE
+        self._buffer = bytearray()
+        self._written = 0
+        self._upload_id = None
+        self._parts = []
+        self._executor = None
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._written
+
+    def write(self, b) -> int:
+        self._buffer += b
+        n = memoryview(b).nbytes
+        self._written += n
+        while len(self._buffer) >= self.part_size:
+            chunk = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._send(chunk)
+        return n
+
+    def _send(self, chunk: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra)['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="s3-part")
+        # Bound memory: wait for the oldest part when two are already in flight
+        in_flight = [f for f in self._parts if not f.done()]
+        if len(in_flight) >= 2:
+            in_flight[0].result()
+        self._parts.append(self._executor.submit(self._upload_part, len(self._parts) + 1, chunk))
+
+    def _upload_part(self, number: int, chunk: bytes) -> dict:
+        resp = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                   PartNumber=number, Body=chunk)
+        return {'PartNumber': number, 'ETag': resp['ETag']}
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.extra)
+            else:
+                if self._buffer:
+                    self._send(bytes(self._buffer))
+                parts = [f.result() for f in self._parts]
+                self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                                  MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._release()
+
+    def abort(self) -> None:
+        """Drop everything written so far; nothing is left in the bucket."""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is not None:
+                for f in self._parts:
+                    f.cancel()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self._buffer = bytearray()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -2,54 +2,75 @@ import hashlib
 import json
 import time
 import os
-import boto3
 from typing import Dict, Any
 from datetime import datetime
 import asyncio
 import unicodedata
-from io import BytesIO
 
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-from matplotlib.backends.backend_svg import FigureCanvasSVG
-from matplotlib.backends.backend_pdf import FigureCanvasPdf
 import matplotlib.pyplot as plt
 
 from backend.celery_app import celery_app
 from backend.models import PosterRequest
 from backend.utils import get_coordinates, load_theme
 from backend.fetcher import MapDataFetcher
+from backend.projection import viewport_lonlat
 from backend.renderer import MapRenderer
+from backend.roads import road_filter_for
+from backend.pool import render_themes
+from backend.raster import save_figure
+from backend.cache import DiskCache
+from backend.progress import ProgressTask
+from backend.storage import S3_BUCKET, S3UploadStream, get_s3_client, build_public_url
 
-# S3 Configuration
-S3_ENDPOINT = os.getenv("S3_ENDPOINT_URL", "http://minio:9000")
-S3_BUCKET = os.getenv("S3_BUCKET", "posters")
-S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "/minio_storage")
-AWS_KEY = os.getenv("AWS_ACCESS_KEY_ID", "minioadmin")
-AWS_SECRET = os.getenv("AWS_SECRET_ACCESS_KEY", "minioadminpassword")
+# Preview renders: output DPI cap, coarser level of detail (in output pixels)
+# and key prefix keeping them out of the poster history
+PREVIEW_DPI = int(os.getenv("PREVIEW_DPI", "72"))
+PREVIEW_LOD_PIXELS = float(os.getenv("PREVIEW_LOD_PIXELS", "2.0"))
+PREVIEW_PREFIX = "previews/"
 
-def get_s3_client():
-    return boto3.client(
-        's3',
-        endpoint_url=S3_ENDPOINT,
-        aws_access_key_id=AWS_KEY,
-        aws_secret_access_key=AWS_SECRET
-    )
+def normalize_request(request: PosterRequest) -> PosterRequest:
+    """Settings actually rendered: previews are a single low DPI PNG of the selected style."""
+    if request.preview:
+        # The projected data tier is shared with full renders
+        request = request.model_copy(update={
+            'all_themes': False, 'format': 'png', 'dpi': min(request.dpi, PREVIEW_DPI)})
+    return request
 
-def build_public_url(object_key: str) -> str:
-    base = S3_PUBLIC_URL.rstrip("/")
-    return f"{base}/{S3_BUCKET}/{object_key}"
 
-@celery_app.task(bind=True)
+def request_hash(request: PosterRequest) -> str:
+    """Identity of a (normalized) request: names its S3 file and deduplicates it at the API."""
+    return hashlib.md5(request.model_dump_json().encode('utf-8')).hexdigest()
+
+
+async def fetch_poster_data(request: PosterRequest, lat: float, lon: float, themes) -> Dict[str, Any]:
+    """Projected map data of a request (same cache entries for the poster task and the warm-up)."""
+    # Fetch the longer side's radius so the whole (non-square) poster is covered
+    ratio = max(request.width, request.height) / min(request.width, request.height)
+    compensated_dist = request.distance * ratio
+
+    bbox = viewport_lonlat((lat, lon), request.distance, request.width, request.height)
+    return await MapDataFetcher.fetch_projected(lat, lon, compensated_dist, request.custom_layers, bbox=bbox,
+                                                road_filter=road_filter_for(request.distance, themes))
+
+
+@celery_app.task
+def cache_stats_task():
+    """
+    Report the OSM disk cache usage and the hit/miss counters of the worker
+    process that picked up this task.
+    """
+    return DiskCache.stats()
+
+@celery_app.task(bind=True, base=ProgressTask)
 def generate_poster_task(self, request_data: Dict[str, Any]):
     """
     Celery task to generate a map poster (Stateless/S3).
     """
     try:
-        request = PosterRequest(**request_data)
+        request = normalize_request(PosterRequest(**request_data))
         
         # 1. Check Cache (S3)
-        req_dump = request.model_dump_json()
-        req_hash = hashlib.md5(req_dump.encode('utf-8')).hexdigest()
+        req_hash = request_hash(request)
         
         def slugify(value):
             value = str(value)
@@ -63,6 +84,8 @@ def generate_poster_task(self, request_data: Dict[str, Any]):
             filename = f"{safe_city}_ALL_THEMES_{req_hash[:8]}.zip"
         else:
             filename = f"{safe_city}_{request.style}_{req_hash[:8]}.{request.format.lower()}"
+        if request.preview:
+            filename = f"{PREVIEW_PREFIX}{filename}"
         
         file_key = filename
         
@@ -90,82 +113,57 @@ def generate_poster_task(self, request_data: Dict[str, Any]):
             if not themes_to_render:
                 themes_to_render = [request.style]
 
+            themes = {theme_id: load_theme(theme_id) for theme_id in themes_to_render}
             self.update_state(state='PROGRESS', meta={'current': 15, 'total': 100, 'status': f'Preparing {len(themes_to_render)} themes...'})
 
             # 2. Fetch Data (ONCE)
             async def _fetch_once():
                  lat, lon = await get_coordinates(request.city, request.country)
-                 # Dummy theme for data fetching logic if it relied on it (it doesn't heavily)
-                 # But we need to ensure we fetch everything needed.
-                 # Actually fetcher handles custom layers.
-                 
-                 aspect = request.width / request.height
-                 max_dim = max(request.width, request.height)
-                 min_dim = min(request.width, request.height)
-                 ratio = max_dim / min_dim
-                 compensated_dist = request.distance * ratio
-                 
-                 return lat, lon, await MapDataFetcher.fetch_all(lat, lon, compensated_dist, request.custom_layers)
+                 return lat, lon, await fetch_poster_data(request, lat, lon, list(themes.values()))
 
             try:
                 lat, lon, data = asyncio.run(_fetch_once())
             except Exception:
                 lat, lon, data = asyncio.new_event_loop().run_until_complete(_fetch_once())
 
-            if not data.get('graph'): raise ValueError("No map data found.")
+            if not data.get('roads'): raise ValueError("No map data found.")
             
-            # 3. Render Loop
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                total = len(themes_to_render)
-                for i, theme_id in enumerate(themes_to_render):
-                    pct = 30 + int((i / total) * 60)
-                    self.update_state(state='PROGRESS', meta={'current': pct, 'total': 100, 'status': f'Rendering {theme_id} ({i+1}/{total})...'})
-                    
-                    theme_cfg = load_theme(theme_id)
-                    # Apply custom overrides if any (though usually all_themes implies defaults, let's keep overrides if feasible, though user might want pure themes)
-                    # Use overrides if they make sense, or maybe skip? The user prompt implies "Generate ONE poster per theme".
-                    # Custom colors usually apply ONE style. Overriding ALL themes with ONE custom color set makes them identical.
-                    # So we ignore custom_colors for all_themes mode except maybe text?
-                    # Let's ignore custom_colors to keep themes distinct.
-                    
-                    renderer = MapRenderer(theme_cfg)
-                    fig = renderer.render(
-                        data=data,
-                        city=request.city,
-                        country=request.country,
-                        point=(lat, lon),
-                        dist=request.distance,
-                        width_in=request.width,
-                        height_in=request.height,
-                        custom_layers_config=request.custom_layers,
-                        text_CONFIG={'country_label': request.country_label, 'name_label': request.name_label},
-                        margins=request.margins
-                    )
-                    
-                    # Print to buf
-                    img_buf = BytesIO()
-                    fmt = request.format.lower()
-                    
-                    if fmt == 'svg': canvas = FigureCanvasSVG(fig)
-                    elif fmt == 'pdf': canvas = FigureCanvasPdf(fig)
-                    else: canvas = FigureCanvasAgg(fig)
+            # 3. Prepare the scene ONCE (projection, cropping, artists), then recolor per theme
+            self.update_state(state='PROGRESS', meta={'current': 25, 'total': 100, 'status': 'Projecting map data...'})
+            # custom_colors are ignored in all_themes mode to keep themes distinct
+            scene = MapRenderer(load_theme(request.style)).prepare(
+                data=data,
+                city=request.city,
+                country=request.country,
+                point=(lat, lon),
+                dist=request.distance,
+                width_in=request.width,
+                height_in=request.height,
+                custom_layers_config=request.custom_layers,
+                text_CONFIG={'country_label': request.country_label, 'name_label': request.name_label},
+                margins=request.margins,
+                dpi=request.dpi
+            )
 
-                    canvas.print_figure(img_buf, format=fmt, dpi=request.dpi, facecolor=theme_cfg['bg'])
-                    plt.close(fig)
-                    
-                    # Add to zip
-                    img_filename = f"{safe_city}_{theme_id}.{fmt}"
-                    zf.writestr(img_filename, img_buf.getvalue())
-                    img_buf.close()
+            fmt = request.format.lower()
+            total = len(themes)
+            self.update_state(state='PROGRESS', meta={'current': 30, 'total': 100, 'status': f'Rendering {total} themes...'})
 
-            # Upload ZIP
+            # 4. Render themes in parallel; each finished image becomes a ZIP entry
+            # streamed straight into a multipart upload (never the whole archive in memory)
             zip_filename = f"{safe_city}_ALL_THEMES_{req_hash[:8]}.zip"
-            zip_buffer.seek(0)
-            
-            s3.upload_fileobj(zip_buffer, S3_BUCKET, zip_filename, ExtraArgs={'ContentType': 'application/zip'})
-            zip_buffer.close()
-            
+            with S3UploadStream(s3, S3_BUCKET, zip_filename, content_type='application/zip') as out:
+                with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    for done, (theme_id, img_path) in enumerate(render_themes(scene, themes, fmt, request.dpi), start=1):
+                        try:
+                            zf.write(img_path, arcname=f"{safe_city}_{theme_id}.{fmt}")
+                        finally:
+                            os.remove(img_path)
+                        pct = 30 + int((done / total) * 60)
+                        self.update_state(state='PROGRESS', meta={'current': pct, 'total': 100, 'status': f'Rendered {theme_id} ({done}/{total})'})
+
+            plt.close(scene.fig)
+
             return {
                 "success": True, 
                 "file_url": build_public_url(zip_filename),
@@ -192,13 +190,7 @@ def generate_poster_task(self, request_data: Dict[str, Any]):
                             if k.startswith('road_'):
                                 theme[k] = cc.roads
     
-                aspect = request.width / request.height
-                max_dim = max(request.width, request.height)
-                min_dim = min(request.width, request.height)
-                ratio = max_dim / min_dim
-                compensated_dist = request.distance * ratio
-                
-                data = await MapDataFetcher.fetch_all(lat, lon, compensated_dist, request.custom_layers)
+                data = await fetch_poster_data(request, lat, lon, [theme])
                 return lat, lon, theme, data
     
             self.update_state(state='PROGRESS', meta={'current': 20, 'total': 100, 'status': 'Fetching map data...'})
@@ -208,7 +200,7 @@ def generate_poster_task(self, request_data: Dict[str, Any]):
             except Exception:
                  lat, lon, theme, data = asyncio.new_event_loop().run_until_complete(_async_logic())
     
-            if not data.get('graph'):
+            if not data.get('roads'):
                  raise ValueError("Could not retrieve map data for this location.")
     
             self.update_state(state='PROGRESS', meta={'current': 60, 'total': 100, 'status': 'Rendering map...'})
@@ -228,38 +220,23 @@ def generate_poster_task(self, request_data: Dict[str, Any]):
                     'country_label': request.country_label,
                     'name_label': request.name_label
                 },
-                margins=request.margins
+                margins=request.margins,
+                dpi=request.dpi,
+                lod_pixels=PREVIEW_LOD_PIXELS if request.preview else None
             )
     
             self.update_state(state='PROGRESS', meta={'current': 90, 'total': 100, 'status': 'Uploading to cloud...'})
     
-            # 5. Save to Buffer & Upload
+            # 5. Stream the encoded file to S3 as it is written
             fmt = request.format.lower()
-            if fmt == 'svg':
-                canvas = FigureCanvasSVG(fig)
-            elif fmt == 'pdf':
-                canvas = FigureCanvasPdf(fig)
-            else:
-                canvas = FigureCanvasAgg(fig)
-            
-            buf = BytesIO()
-            # Strict sizing: no bbox_tight, use exact dpi
-            canvas.print_figure(buf, format=fmt, dpi=request.dpi, facecolor=theme['bg'])
-            buf.seek(0)
-            
-            # Upload
             content_type = f"image/{fmt}" if fmt != 'svg' else 'image/svg+xml'
             if fmt == 'pdf': content_type = 'application/pdf'
             
-            s3.upload_fileobj(
-                buf, 
-                S3_BUCKET, 
-                file_key,
-                ExtraArgs={'ContentType': content_type}
-            )
+            with S3UploadStream(s3, S3_BUCKET, file_key, content_type=content_type) as out:
+                # Strict sizing: no bbox_tight, use exact dpi (large PNGs are rasterized in bands)
+                save_figure(fig, out, fmt, request.dpi, theme['bg'])
             
             plt.close(fig)
-            buf.close()
     
             return {
                 "success": True, 
@@ -0,0 +1,88 @@
+import os
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+import networkx as nx
+import geopandas as gpd
+import osmnx as ox
+import pandas as pd
+from shapely.geometry import box
+
+# Edge of the square lat/lon tiles the OSM cache is organised in, in degrees
+TILE_DEG = float(os.getenv("OSM_TILE_DEG", "0.05"))
+
+Tile = Tuple[int, int]
+BBox = Tuple[float, float, float, float]  # (west, south, east, north), as OSMnx expects
+
+
+def request_bbox(point, dist) -> BBox:
+    """Bounding box of a `dist` meters request around (lat, lon)."""
+    return tuple(float(c) for c in ox.utils_geo.bbox_from_point(point, dist))
+
+
+def tiles_for_bbox(bbox: BBox, deg: float = None) -> List[Tile]:
+    """Grid tiles (column, row) covering `bbox`."""
+    deg = deg or TILE_DEG
+    west, south, east, north = bbox
+    cols = range(math.floor(west / deg), math.floor(east / deg) + 1)
+    rows = range(math.floor(south / deg), math.floor(north / deg) + 1)
+    return [(c, r) for c in cols for r in rows]
+
+
+def tile_bbox(tile: Tile, deg: float = None) -> BBox:
+    deg = deg or TILE_DEG
+    c, r = tile
+    return (c * deg, r * deg, (c + 1) * deg, (r + 1) * deg)
+
+
+def covering_bbox(tiles: List[Tile], deg: float = None) -> BBox:
+    """Smallest bbox containing all `tiles`, so missing tiles are fetched in one query."""
+    boxes = np.array([tile_bbox(t, deg) for t in tiles])
+    return (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+
+
+def split_graph(G: nx.MultiDiGraph, tiles: List[Tile], deg: float = None) -> Dict[Tile, nx.MultiDiGraph]:
+    """
+    Distribute edges to the tiles holding their endpoints. An edge crossing a
+    tile border is stored in both tiles, so each tile is self-contained.
+    """
+    deg = deg or TILE_DEG
+    wanted = set(tiles)
+    node_tile = {n: (math.floor(x / deg), math.floor(y / deg)) for n, x, y in
+                 ((n, d['x'], d['y']) for n, d in G.nodes(data=True))}
+    edges = {t: [] for t in tiles}
+    for u, v, k in G.edges(keys=True):
+        for t in {node_tile[u], node_tile[v]} & wanted:
+            edges[t].append((u, v, k))
+    return {t: G.edge_subgraph(e).copy() if e else nx.MultiDiGraph(crs=G.graph.get('crs')) for t, e in edges.items()}
+
+
+def merge_graphs(graphs: List[nx.MultiDiGraph], bbox: BBox = None) -> nx.MultiDiGraph:
+    """Union of tile graphs, truncated to the edges touching `bbox`."""
+    G = nx.compose_all(graphs)
+    G.graph['crs'] = graphs[0].graph.get('crs')
+    if bbox is not None and len(G):
+        G = ox.truncate.truncate_graph_bbox(G, bbox, truncate_by_edge=True)
+    return G
+
+
+def split_features(feats: gpd.GeoDataFrame, tiles: List[Tile], deg: float = None) -> Dict[Tile, gpd.GeoDataFrame]:
+    """Every feature goes to each tile it intersects (large lakes span several)."""
+    result = {}
+    for t in tiles:
+        idx = feats.sindex.query(box(*tile_bbox(t, deg)), predicate="intersects")
+        result[t] = feats.iloc[np.sort(idx)]
+    return result
+
+
+def merge_features(parts: List[gpd.GeoDataFrame], bbox: BBox = None) -> gpd.GeoDataFrame:
+    """Union of tile feature sets, deduplicated on the OSM (element, id) index."""
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+    feats = pd.concat(parts) if len(parts) > 1 else parts[0]
+    feats = feats[~feats.index.duplicated()]
+    if bbox is not None:
+        feats = feats.iloc[np.sort(feats.sindex.query(box(*bbox), predicate="intersects"))]
+    return feats
@@ -1,10 +1,11 @@
 import os
 import json
 import asyncio
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from geopy.geocoders import Nominatim
 from backend.cache import DiskCache
+from backend import gazetteer
 
 THEMES_DIR = Path("themes")
 FONTS_DIR = Path("fonts")
@@ -56,14 +57,21 @@ def list_themes() -> list[str]:
     if not THEMES_DIR.exists(): return []
     return [f.stem for f in THEMES_DIR.glob("*.json")]
 
+def known_coordinates(city: str, country: str) -> Optional[Tuple[float, float]]:
+    """Coordinates available without a network call (offline gazetteer or an earlier geocoding), else None."""
+    return gazetteer.lookup(city, country) or DiskCache.get(f"coords_{city.lower()}_{country.lower()}")
+
+
 async def get_coordinates(city: str, country: str) -> Tuple[float, float]:
     """
-    Async wrapper for geocoding with caching.
+    Async wrapper for geocoding with caching. Known cities are resolved by
+    the offline gazetteer without any network round trip.
     """
+    coords = known_coordinates(city, country)
+    if coords:
+        return coords
+
     key = f"coords_{city.lower()}_{country.lower()}"
-    cached = DiskCache.get(key)
-    if cached:
-        return cached
 
     # Run blocking synchronous geocoding in a thread
     def _geocode():
@@ -0,0 +1,157 @@
+"""
+Cache warm-up for the most requested posters: geocodes a city list and
+fetches the projected map data of every preset distance and paper size, so
+the first request after a deploy or a cache eviction is a cache hit.
+
+    python -m backend.warmup [cities.txt] [--distances 5000,10000] [--sizes A4,A3] [--previews]
+
+Celery beat runs the same job every night (`warmup_task`, see WARMUP_HOUR
+in celery_app). Overpass is queried by at most WARMUP_CONCURRENCY cities at
+a time, spaced by WARMUP_OVERPASS_INTERVAL; Nominatim (cities neither in
+the offline gazetteer nor geocoded before) once per second.
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backend.cache import DiskCache
+from backend.celery_app import celery_app
+from backend.models import PosterRequest
+from backend.sources import get_source
+from backend.tasks import fetch_poster_data, generate_poster_task
+from backend.utils import get_coordinates, known_coordinates, load_theme
+
+# One "City, Country" per line; '#' starts a comment
+WARMUP_CITIES = Path(os.getenv("WARMUP_CITIES", str(Path(__file__).with_name("warmup_cities.txt"))))
+WARMUP_DISTANCES = [int(d) for d in os.getenv("WARMUP_DISTANCES", "5000,10000,20000").split(",")]
+WARMUP_PREVIEWS = os.getenv("WARMUP_PREVIEWS", "false").lower() == "true"
+
+# Cities fetched in parallel (Overpass grants about two slots per client) and
+# minimum delay between two Overpass queries during the warm-up
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+WARMUP_OVERPASS_INTERVAL = float(os.getenv("WARMUP_OVERPASS_INTERVAL", "1.0"))
+
+# Nominatim usage policy: at most one request per second
+NOMINATIM_INTERVAL = 1.0
+
+# Paper presets of the frontend (PAPER_SIZES in SidebarControls.svelte), in inches
+PAPER_SIZES = {
+    "A4": (8.27, 11.69),
+    "A3": (11.69, 16.53),
+    "12x16": (12.0, 16.0),
+    "30x40cm": (11.81, 15.75),
+}
+
+City = Tuple[str, str]
+
+
+def read_cities(path: Path = None) -> List[City]:
+    cities = []
+    for line in Path(path or WARMUP_CITIES).read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if "," in line:
+            city, country = line.rsplit(",", 1)
+            cities.append((city.strip(), country.strip()))
+    return cities
+
+
+async def geocode_all(cities: List[City]) -> Dict[City, Tuple[float, float]]:
+    """Coordinates of every city that could be found, paced for Nominatim."""
+    coords = {}
+    for city, country in cities:
+        known = known_coordinates(city, country)
+        if known:
+            coords[(city, country)] = known
+            continue
+        try:
+            coords[(city, country)] = await get_coordinates(city, country)
+        except Exception as e:
+            print(f"Warm-up: skipping {city}, {country}: {e}")
+        # Only after an actual Nominatim request
+        await asyncio.sleep(NOMINATIM_INTERVAL)
+    return coords
+
+
+def warm_city(city: City, point: Tuple[float, float], distances: List[int], sizes: List[Tuple[float, float]],
+              style: str, previews: bool = False) -> Tuple[int, int]:
+    """Fetch every preset of one city (largest radius first, so the others reuse its tiles). Returns (warmed, failed)."""
+    theme = load_theme(style)
+    warmed = failed = 0
+    for distance in sorted(distances, reverse=True):
+        for width, height in sizes:
+            request = PosterRequest(city=city[0], country=city[1], style=style, distance=distance,
+                                    width=width, height=height)
+            try:
+                data = asyncio.run(fetch_poster_data(request, *point, [theme]))
+            except Exception as e:
+                print(f"Warm-up: {city[0]} at {distance} m failed: {e}")
+                data = {}
+            if not data.get("roads"):
+                failed += 1
+                continue
+            warmed += 1
+            if previews:
+                # Rendered by the preview workers from the data just cached, then served from S3
+                generate_poster_task.delay(request.model_copy(update={"preview": True}).model_dump())
+    return warmed, failed
+
+
+def run(cities: List[City], distances: List[int] = None, sizes: List[Tuple[float, float]] = None,
+        style: str = None, previews: bool = False, concurrency: int = None,
+        interval: float = None) -> Dict[str, int]:
+    """Warm the caches for `cities` x `distances` x paper `sizes`; returns counts."""
+    distances = distances or WARMUP_DISTANCES
+    sizes = sizes or list(PAPER_SIZES.values())
+    style = style or PosterRequest.model_fields["style"].default
+    started = time.time()
+
+    coords = asyncio.run(geocode_all(cities))
+    source = get_source()
+    pacing = source.paced(WARMUP_OVERPASS_INTERVAL if interval is None else interval) \
+        if hasattr(source, "paced") else nullcontext()
+    with pacing, ThreadPoolExecutor(concurrency or WARMUP_CONCURRENCY) as pool:
+        results = list(pool.map(lambda c: warm_city(c, coords[c], distances, sizes, style, previews), coords))
+    # Let the shared cache tier finish its uploads before the job ends
+    DiskCache.flush()
+
+    stats = {
+        "cities": len(coords),
+        "not_found": len(cities) - len(coords),
+        "warmed": sum(w for w, _ in results),
+        "failed": sum(f for _, f in results),
+        "seconds": round(time.time() - started),
+    }
+    print(f"Warm-up done: {stats}")
+    return stats
+
+
+@celery_app.task
+def warmup_task(cities: Optional[List[List[str]]] = None, distances: Optional[List[int]] = None,
+                previews: bool = None):
+    """Scheduled warm-up (Celery beat); defaults to the bundled city list."""
+    cities = [tuple(c) for c in cities] if cities else read_cities()
+    return run(cities, distances, previews=WARMUP_PREVIEWS if previews is None else previews)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.warmup")
+    parser.add_argument("cities", nargs="?", type=Path, help=f"city list (default: {WARMUP_CITIES})")
+    parser.add_argument("--distances", help="comma-separated radii in meters")
+    parser.add_argument("--sizes", help=f"comma-separated paper presets ({', '.join(PAPER_SIZES)})")
+    parser.add_argument("--style", help="theme whose street filter applies")
+    parser.add_argument("--previews", action="store_true", help="also queue a preview render of each preset")
+    parser.add_argument("--concurrency", type=int)
+    args = parser.parse_args(argv)
+
+    distances = [int(d) for d in args.distances.split(",")] if args.distances else None
+    sizes = [PAPER_SIZES[s] for s in args.sizes.split(",")] if args.sizes else None
+    run(read_cities(args.cities), distances, sizes, args.style, args.previews, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cache format benchmark: pickle vs columnar (Arrow IPC graph table, GeoParquet).
+
+    python -m benchmarks.bench_cache [small medium metro]
+
+Writes each payload with both codecs into a temporary directory, then loads it
+in a fresh forked process and reports file size, load time and RSS growth.
+Graphs are loaded both as a full NetworkX graph and as the packed RoadNetwork
+the render path actually consumes.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Polygon
+
+from backend.cache import GeoParquetCodec, GraphArrowCodec, PickleCodec
+from backend.roads import RoadNetwork
+from benchmarks.common import SIZES, Timer, peak_rss_mb, run_isolated, synthetic_graph
+
+
+def osm_like_graph(side):
+    """Synthetic grid carrying the usual OSMnx edge/node attributes."""
+    G = synthetic_graph(side)
+    for n, data in G.nodes(data=True):
+        data.update(street_count=4, osmid=n)
+    for u, v, data in G.edges(data=True):
+        data.update(oneway=False, reversed=u > v, length=50.0, name=f"Rue {u % 977}", lanes="2", maxspeed="50")
+    return G
+
+
+def osm_like_features(count, seed=0):
+    rng = np.random.default_rng(seed)
+    cx = rng.uniform(2.2, 2.5, count)
+    cy = rng.uniform(48.8, 48.9, count)
+    geoms = [Polygon([(x + 0.001 * np.cos(a), y + 0.001 * np.sin(a)) for a in np.linspace(0, 2 * np.pi, 24)])
+             for x, y in zip(cx, cy)]
+    return gpd.GeoDataFrame({"natural": "water", "name": [f"Lac {i}" for i in range(count)]},
+                            geometry=geoms, crs="EPSG:4326")
+
+
+def load(loader, path):
+    before = peak_rss_mb()
+    with Timer() as t:
+        value = loader(path)
+    return t.elapsed, peak_rss_mb() - before, len(value)
+
+
+def pickle_to_roads(path):
+    return RoadNetwork.from_graph(PickleCodec.load(path))
+
+
+def arrow_to_roads(path):
+    return GraphArrowCodec.roads_from_tables([GraphArrowCodec.read_table(path)])
+
+
+# (label, codec used to write, loader)
+GRAPH_LOADERS = (
+    ("pickle -> graph", PickleCodec, PickleCodec.load),
+    ("pickle -> roads", PickleCodec, pickle_to_roads),
+    ("arrow -> graph", GraphArrowCodec, GraphArrowCodec.load),
+    ("arrow -> roads", GraphArrowCodec, arrow_to_roads),
+)
+FEATURE_LOADERS = (
+    ("pickle", PickleCodec, PickleCodec.load),
+    ("geoparquet", GeoParquetCodec, GeoParquetCodec.load),
+)
+
+
+def main(sizes):
+    print(f"{'payload':<18}{'format -> result':<20}{'size (MB)':>10}{'load (s)':>10}{'RSS delta (MB)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in sizes:
+            side = SIZES[name]
+            payloads = (
+                (f"graph/{name}", osm_like_graph(side), GRAPH_LOADERS),
+                (f"features/{name}", osm_like_features(side * 20), FEATURE_LOADERS),
+            )
+            for label, value, loaders in payloads:
+                for codec in {codec for _, codec, _ in loaders}:
+                    codec.dump(value, Path(tmp) / f"{label.replace('/', '_')}{codec.suffix}")
+                for loader_label, codec, loader in loaders:
+                    path = Path(tmp) / f"{label.replace('/', '_')}{codec.suffix}"
+                    elapsed, delta, _ = run_isolated(load, loader, path)
+                    size = path.stat().st_size / 1e6
+                    print(f"{label:<18}{loader_label:<20}{size:>10.1f}{elapsed:>10.2f}{delta:>16.0f}")
+                del value
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(SIZES))
@@ -0,0 +1,106 @@
+"""
+Level-of-detail benchmark: draw densely sampled geometry as-is vs simplified
+to LOD_PIXELS of an output pixel (`MapRenderer.prepare(..., dpi=...)`).
+
+    python -m benchmarks.bench_lod [dpi ...]
+
+Scene: 12x16 in poster, 5 km radius, a street grid whose edges are sampled
+every metre (like long curvy OSM ways) and a coastline with 200k vertices.
+Reports drawn vertices, PNG and PDF time (prepare + save), PDF size, the share
+of PNG pixels that differ by more than 32/255 between the two paths and the
+largest difference. Agg already thins sub-pixel segments on the fly
+(`path.simplify`), so LOD mostly pays off on vector output.
+"""
+import io
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+from shapely.geometry import Polygon
+
+from backend.geometry import PolygonSet
+from backend.projection import project_point, utm_crs
+from backend.raster import save_figure
+from backend.renderer import MapRenderer
+from backend.roads import RoadNetwork
+from backend.utils import load_theme
+from benchmarks.common import Timer
+
+THEME = load_theme("noir")
+WIDTH, HEIGHT = 12, 16
+POINT, DIST = (48.875, 2.375), 5000
+
+
+def _data():
+    crs = utm_crs(POINT)
+    cx, cy = project_point(POINT, crs)
+    rng = np.random.default_rng(0)
+
+    # 80 x 80 street grid, edges 125 m long sampled every metre with a gentle wiggle
+    side, spacing, samples = 80, 125.0, 126
+    t = np.linspace(0, 1, samples)
+    wiggle = 4 * np.sin(np.pi * t)
+    starts = np.stack(np.meshgrid(np.arange(side - 1), np.arange(side)), -1).reshape(-1, 2) * spacing
+    h = np.empty((len(starts), samples, 2))
+    h[:, :, 0] = starts[:, None, 0] + t * spacing
+    h[:, :, 1] = starts[:, None, 1] + wiggle
+    v = h[:, :, ::-1].copy()
+    coords = np.concatenate([h, v]).reshape(-1, 2) + (cx - side * spacing / 2, cy - side * spacing / 2)
+    n = 2 * len(starts)
+    offsets = np.arange(n + 1, dtype=np.int64) * samples
+    classes = rng.choice([1, 2, 3, 4], size=n, p=[0.05, 0.15, 0.2, 0.6]).astype(np.uint8)
+    roads = RoadNetwork(coords, offsets, classes, crs=crs)
+
+    # Noisy coastline closing a sea in the lower-left part of the map
+    angles = np.linspace(0, np.pi / 2, 200_000)
+    radius = 4000 + np.cumsum(rng.normal(0, 2, len(angles)))
+    coast = np.column_stack([cx - 5000 + radius * np.cos(angles), cy - 5000 + radius * np.sin(angles)])
+    water = PolygonSet.from_geometries([Polygon(np.vstack([[cx - 5000, cy - 5000], coast]))], crs=crs)
+    return {"roads": roads, "water": water, "parks": None, "crs": crs}
+
+
+def _prepare(data, dpi, lod):
+    return MapRenderer(THEME).prepare(data, "Paris", "France", POINT, DIST, WIDTH, HEIGHT,
+                                      dpi=dpi if lod else None)
+
+
+def _png(data, dpi, lod):
+    scene = _prepare(data, dpi, lod)
+    vertices = sum(len(p.vertices) for c in scene.layers.values() for p in c.get_paths())
+    vertices += sum(len(p.vertices) for lc in scene.roads for p in lc.get_paths())
+    buf = io.BytesIO()
+    FigureCanvasAgg(scene.fig).print_figure(buf, format="png", dpi=dpi, facecolor=THEME["bg"])
+    buf.seek(0)
+    return vertices, np.asarray(Image.open(buf).convert("RGB"), dtype=np.int16)
+
+
+def _pdf(data, dpi, lod):
+    buf = io.BytesIO()
+    save_figure(_prepare(data, dpi, lod).fig, buf, "pdf", dpi, THEME["bg"])
+    return buf.tell()
+
+
+def main(dpis):
+    data = _data()
+    print(f"{'dpi':>5}  {'path':<6}{'vertices':>12}{'PNG (s)':>9}{'PDF (s)':>9}{'PDF (MB)':>10}"
+          f"{'diff px (%)':>13}{'max diff':>10}")
+    for dpi in dpis:
+        images = {}
+        for label, lod in (("full", False), ("lod", True)):
+            with Timer() as t_png:
+                vertices, images[label] = _png(data, dpi, lod)
+            with Timer() as t_pdf:
+                pdf_size = _pdf(data, dpi, lod)
+            diff = peak = ""
+            if label == "lod":
+                delta = np.abs(images["lod"] - images["full"]).max(axis=-1)
+                diff, peak = f"{100 * (delta > 32).mean():.3f}", f"{delta.max()}/255"
+            print(f"{dpi:>5}  {label:<6}{vertices:>12,}{t_png.elapsed:>9.2f}{t_pdf.elapsed:>9.2f}"
+                  f"{pdf_size / 1e6:>10.2f}{diff:>13}{peak:>10}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [150, 300])
@@ -0,0 +1,64 @@
+"""
+Large poster rasterization benchmark: one full Agg buffer (`print_figure`) vs
+banded rendering streamed into a PNG (`backend.raster.write_png_bands`).
+
+    python -m benchmarks.bench_raster [dpi ...]
+
+Renders a 36x48 in poster of the `medium` synthetic city at each DPI
+(default 150 300) into a temporary file, each case in its own forked
+process; RSS is the process peak.
+"""
+import sys
+import tempfile
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from backend.raster import write_png_bands
+from backend.renderer import MapRenderer
+from backend.utils import load_theme
+from benchmarks.common import SIZES, Timer, peak_rss_mb, run_isolated, synthetic_graph
+
+THEME = load_theme("noir")
+WIDTH, HEIGHT = 36, 48
+
+
+def _scene():
+    G = synthetic_graph(SIZES["medium"], crs="EPSG:4326", spacing=0.0005)
+    for _, data in G.nodes(data=True):
+        data["x"] -= 440000.0 - 2.3
+        data["y"] -= 5400000.0 - 48.8
+    return MapRenderer(THEME).prepare({"graph": G, "water": None, "parks": None}, "Paris", "France",
+                                      (48.875, 2.375), 5000, WIDTH, HEIGHT)
+
+
+def full(dpi):
+    scene = _scene()
+    before = peak_rss_mb()
+    with tempfile.TemporaryFile() as f, Timer() as t:
+        FigureCanvasAgg(scene.fig).print_figure(f, format="png", dpi=dpi, facecolor=THEME["bg"])
+        size = f.tell()
+    return t.elapsed, peak_rss_mb() - before, size
+
+
+def banded(dpi):
+    scene = _scene()
+    before = peak_rss_mb()
+    with tempfile.TemporaryFile() as f, Timer() as t:
+        write_png_bands(scene.fig, f, dpi, THEME["bg"])
+        size = f.tell()
+    return t.elapsed, peak_rss_mb() - before, size
+
+
+def main(dpis):
+    print(f"{'dpi':>5}{'pixels (M)':>12}  {'path':<8}{'time (s)':>10}{'RSS delta (MB)':>16}{'PNG (MB)':>10}")
+    for dpi in dpis:
+        mpx = WIDTH * HEIGHT * dpi * dpi / 1e6
+        for label, fn in (("full", full), ("banded", banded)):
+            elapsed, delta, size = run_isolated(fn, dpi)
+            print(f"{dpi:>5}{mpx:>12.0f}  {label:<8}{elapsed:>10.2f}{delta:>16.0f}{size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [150, 300])
@@ -0,0 +1,67 @@
+"""
+Road drawing benchmark: `ox.plot_graph` (legacy path) vs the packed
+LineCollection painter in `backend.roads`.
+
+    python -m benchmarks.bench_roads [small medium metro]
+
+Each case runs in its own forked process; reported times cover building the
+artists plus one Agg rasterization at 150 DPI, RSS is the process peak.
+"""
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+import osmnx as ox
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from backend.roads import RoadNetwork, classify_edges, draw_roads, edge_colors, edge_widths
+from backend.utils import load_theme
+from benchmarks.common import SIZES, Timer, peak_rss_mb, run_isolated, synthetic_graph
+
+THEME = load_theme("noir")
+DPI = 150
+
+
+def _figure():
+    fig = Figure(figsize=(12, 16), facecolor=THEME["bg"])
+    return fig, fig.add_subplot(111)
+
+
+def legacy(G):
+    before = peak_rss_mb()
+    fig, ax = _figure()
+    with Timer() as t:
+        classes = classify_edges(G)
+        ox.plot_graph(G, ax=ax, bgcolor=THEME["bg"], node_size=0,
+                      edge_color=edge_colors(classes, THEME).tolist(), edge_linewidth=edge_widths(classes).tolist(),
+                      show=False, close=False)
+        FigureCanvasAgg(fig).draw()
+    return t.elapsed, peak_rss_mb(), peak_rss_mb() - before
+
+
+def packed(G):
+    before = peak_rss_mb()
+    fig, ax = _figure()
+    with Timer() as t:
+        roads = RoadNetwork.from_graph(G)
+        draw_roads(ax, roads, THEME)
+        ax.set_xlim(roads.coords[:, 0].min(), roads.coords[:, 0].max())
+        ax.set_ylim(roads.coords[:, 1].min(), roads.coords[:, 1].max())
+        ax.set_aspect("equal")
+        FigureCanvasAgg(fig).draw()
+    return t.elapsed, peak_rss_mb(), peak_rss_mb() - before
+
+
+def main(sizes):
+    print(f"{'size':<8}{'edges':>10}  {'path':<10}{'time (s)':>10}{'peak RSS (MB)':>16}{'delta (MB)':>12}")
+    for name in sizes:
+        G = synthetic_graph(SIZES[name])
+        for label, fn in (("plot_graph", legacy), ("packed", packed)):
+            elapsed, peak, delta = run_isolated(fn, G)
+            print(f"{name:<8}{G.number_of_edges():>10}  {label:<10}{elapsed:>10.2f}{peak:>16.0f}{delta:>12.0f}")
+        del G
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(SIZES))
@@ -0,0 +1,98 @@
+"""
+Shared helpers for the benchmark scripts (synthetic OSM-like data, isolated runs).
+Run benchmarks from the repository root, e.g. `python -m benchmarks.bench_roads`.
+"""
+import multiprocessing as mp
+import resource
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+from shapely.geometry import LineString
+
+HIGHWAYS = ["motorway", "primary", "secondary", "tertiary", "residential", "service", "footway"]
+HIGHWAY_WEIGHTS = [0.01, 0.04, 0.07, 0.1, 0.5, 0.18, 0.1]
+
+# name -> grid side (nodes); edges ~= 4 * side^2 (both directions)
+SIZES = {
+    "small": 100,
+    "medium": 300,
+    "metro": 550,
+}
+
+
+def synthetic_graph(side: int, spacing: float = 50.0, crs: str = "EPSG:32631", seed: int = 0) -> nx.MultiDiGraph:
+    """
+    Two-way street grid in a projected CRS, shaped like an OSMnx graph:
+    x/y node attributes, `highway` tags and a curved `geometry` on ~30% of edges.
+    """
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph(crs=crs)
+    x0, y0 = 440000.0, 5400000.0
+    for i in range(side):
+        for j in range(side):
+            G.add_node(i * side + j, x=x0 + j * spacing, y=y0 + i * spacing)
+
+    def add(u, v):
+        hw = HIGHWAYS[rng.choice(len(HIGHWAYS), p=HIGHWAY_WEIGHTS)]
+        attrs = {"highway": hw, "osmid": u * 7 + v}
+        if rng.random() < 0.3:
+            ux, uy = G.nodes[u]["x"], G.nodes[u]["y"]
+            vx, vy = G.nodes[v]["x"], G.nodes[v]["y"]
+            mid = ((ux + vx) / 2 + rng.normal(0, 5), (uy + vy) / 2 + rng.normal(0, 5))
+            line = LineString([(ux, uy), mid, (vx, vy)])
+            G.add_edge(u, v, geometry=line, **attrs)
+            G.add_edge(v, u, geometry=line.reverse(), **attrs)
+        else:
+            G.add_edge(u, v, **attrs)
+            G.add_edge(v, u, **attrs)
+
+    for i in range(side):
+        for j in range(side):
+            n = i * side + j
+            if j + 1 < side:
+                add(n, n + 1)
+            if i + 1 < side:
+                add(n, n + side)
+    return G
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(conn, fn, args):
+    try:
+        conn.send(fn(*args))
+    except Exception as e:
+        conn.send(e)
+    finally:
+        conn.close()
+
+
+def run_isolated(fn, *args):
+    """
+    Run `fn(*args)` in a fresh forked process so that peak RSS measurements of
+    one case do not leak into the next. `fn` must return a picklable result.
+    """
+    ctx = mp.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(child, fn, args))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -21,6 +21,8 @@ from typing import cast
 from geopandas import GeoDataFrame
 import pickle
 from shapely.geometry import Point
+from backend import gazetteer
+from backend.roads import HIGHWAY_CLASS, classify_edges, edge_colors, edge_widths
 
 # Ensure output is flushed immediately for Node.js streaming
 sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
@@ -187,73 +189,20 @@ def create_gradient_fade(ax, color, location='bottom', zorder=10):
     ax.imshow(gradient, extent=[xlim[0], xlim[1], y_bottom, y_top], 
               aspect='auto', cmap=custom_cmap, zorder=zorder, origin='lower')
 
-def get_edge_colors_by_type(G):
-    """
-    Assigns colors to edges based on road type hierarchy.
-    Returns a list of colors corresponding to each edge in the graph.
-    """
-    edge_colors = []
-
-    for u, v, data in G.edges(data=True):
-        # Get the highway type (can be a list or string)
-        highway = data.get('highway', 'unclassified')
-
-        # Handle list of highway types (take the first one)
-        if isinstance(highway, list):
-            highway = highway[0] if highway else 'unclassified'
-
-        # Assign color based on road type
-        if highway in ['motorway', 'motorway_link']:
-            color = THEME['road_motorway']
-        elif highway in ['trunk', 'trunk_link', 'primary', 'primary_link']:
-            color = THEME['road_primary']
-        elif highway in ['secondary', 'secondary_link']:
-            color = THEME['road_secondary']
-        elif highway in ['tertiary', 'tertiary_link']:
-            color = THEME['road_tertiary']
-        elif highway in ['residential', 'living_street', 'unclassified']:
-            color = THEME['road_residential']
-        else:
-            color = THEME['road_default']
-
-        edge_colors.append(color)
-
-    return edge_colors
-
-def get_edge_widths_by_type(G):
-    """
-    Assigns line widths to edges based on road type.
-    Major roads get thicker lines.
-    """
-    edge_widths = []
-
-    for u, v, data in G.edges(data=True):
-        highway = data.get('highway', 'unclassified')
-
-        if isinstance(highway, list):
-            highway = highway[0] if highway else 'unclassified'
-
-        # Assign width based on road importance
-        if highway in ['motorway', 'motorway_link']:
-            width = 1.2
-        elif highway in ['trunk', 'trunk_link', 'primary', 'primary_link']:
-            width = 1.0
-        elif highway in ['secondary', 'secondary_link']:
-            width = 0.8
-        elif highway in ['tertiary', 'tertiary_link']:
-            width = 0.6
-        else:
-            width = 0.4
-
-        edge_widths.append(width)
-
-    return edge_widths
+# Road hierarchy shared with the backend (backend.roads.ROAD_CLASSES); the CLI
+# also draws unclassified streets as residential ones
+CLI_HIGHWAY_CLASS = {**HIGHWAY_CLASS, 'unclassified': HIGHWAY_CLASS['residential']}
 
 def get_coordinates(city, country):
     """
     Fetches coordinates for a given city and country using geopy.
     Includes rate limiting to be respectful to the geocoding service.
     """
+    offline = gazetteer.lookup(city, country)
+    if offline:
+        print(f"✓ Found {city}, {country} in the offline gazetteer")
+        return offline
+
     coords = f"coords_{city.lower()}_{country.lower()}"
     cached = cache_get(coords)
     if cached:
@@ -487,8 +436,7 @@ def create_poster(city, country, point, dist, output_file, output_format, width=
 
     # Layer 2: Roads with hierarchy coloring
     print("Applying road hierarchy colors...")
-    edge_colors = get_edge_colors_by_type(G_proj)
-    edge_widths = get_edge_widths_by_type(G_proj)
+    edge_classes = classify_edges(G_proj, CLI_HIGHWAY_CLASS)
 
     # Determine cropping limits to maintain the poster aspect ratio
     crop_xlim, crop_ylim = get_crop_limits(G_proj, point, fig, compensated_dist)
@@ -496,8 +444,8 @@ def create_poster(city, country, point, dist, output_file, output_format, width=
     ox.plot_graph(
         G_proj, ax=ax, bgcolor=THEME['bg'],
         node_size=0,
-        edge_color=edge_colors,
-        edge_linewidth=edge_widths,
+        edge_color=edge_colors(edge_classes, THEME).tolist(),
+        edge_linewidth=edge_widths(edge_classes).tolist(),
         show=False, close=False
     )
     
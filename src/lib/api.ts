@@ -23,7 +23,68 @@ export async function fetchHistory(limit = 10): Promise<any[]> {
     }
 }
 
-// Helper for Polling Architecture
+// Final GenerationResponse of a finished task (SUCCESS or FAILURE status payload)
+function finishedTask(task: any, onProgress?: (percent: number, text: string) => void): GenerationResponse {
+    if (task.status === 'SUCCESS') {
+        // Success!
+        if (onProgress) onProgress(100, "Terminé !");
+        // The result from celery task (tasks.py) contains { success: true, file_url: ... }
+        const result = task.result;
+        return {
+            success: true,
+            files: result.file_url ? [result.file_url] : [], // Use full URL from S3
+            debug: JSON.stringify(result)
+        };
+    }
+    const rawError = task.error || "Erreur inconnue";
+    let message = rawError;
+    if (typeof rawError === "string") {
+        if (rawError.includes("No map data found") || rawError.includes("Could not retrieve map data")) {
+            message = "Aucune donnée OSM disponible pour cette zone. Essayez une distance plus petite.";
+        } else if (rawError.includes("Nominatim")) {
+            message = "Le service de géocodage est temporairement indisponible. Réessayez plus tard.";
+        }
+    }
+    return { success: false, files: [], error: message };
+}
+
+// Follow a task over server-sent events. Resolves with the final status payload,
+// or null if streaming is unavailable or drops (the caller then falls back to polling).
+function streamTask(
+    taskId: string,
+    onProgress?: (percent: number, text: string) => void,
+    signal?: AbortSignal
+): Promise<any | null> {
+    if (typeof EventSource === "undefined") return Promise.resolve(null);
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/tasks/${taskId}/events`);
+        const close = () => {
+            source.close();
+            signal?.removeEventListener("abort", onAbort);
+        };
+        const onAbort = () => {
+            close();
+            reject(new DOMException('Aborted', 'AbortError'));
+        };
+        signal?.addEventListener("abort", onAbort);
+
+        source.addEventListener("progress", (e) => {
+            const task = JSON.parse((e as MessageEvent).data);
+            if (task.status === 'SUCCESS' || task.status === 'FAILURE') {
+                close();
+                resolve(task);
+            } else if (onProgress && task.progress) {
+                onProgress(task.progress.current || 0, task.progress.status || "Traitement...");
+            }
+        });
+        source.onerror = () => {
+            close();
+            resolve(null);
+        };
+    });
+}
+
+// Progress over server-sent events, polling as a fallback
 export async function generatePoster(
     payload: GenerationRequest,
     onProgress?: (percent: number, text: string) => void,
@@ -74,7 +135,11 @@ export async function generatePoster(
             return { success: false, files: [], error: "Pas de Task ID reçu." };
         }
 
-        // 2. Poll Status
+        // 2. Stream status updates
+        const streamed = await streamTask(task_id, onProgress, signal);
+        if (streamed) return finishedTask(streamed, onProgress);
+
+        // 3. Fallback: poll status
         let pollDelayMs = 1000;
         const maxPollDelayMs = 5000;
         let lastProgress = -1;
@@ -104,30 +169,8 @@ export async function generatePoster(
                 } else {
                     pollDelayMs = Math.min(maxPollDelayMs, Math.round(pollDelayMs * 1.4));
                 }
-            } else if (task.status === 'SUCCESS') {
-                // Success!
-                if (onProgress) onProgress(100, "Terminé !");
-                // The result from celery task (tasks.py) contains { success: true, file_url: ... }
-                // Frontend expects { success, files: [] } or something.
-                // My tasks.py returns { success, file_url, ... }
-                // Let's adapt it.
-                const result = task.result;
-                return {
-                    success: true,
-                    files: result.file_url ? [result.file_url] : [], // Use full URL from S3
-                    debug: JSON.stringify(result)
-                };
-            } else if (task.status === 'FAILURE') {
-                const rawError = task.error || "Erreur inconnue";
-                let message = rawError;
-                if (typeof rawError === "string") {
-                    if (rawError.includes("No map data found") || rawError.includes("Could not retrieve map data")) {
-                        message = "Aucune donnée OSM disponible pour cette zone. Essayez une distance plus petite.";
-                    } else if (rawError.includes("Nominatim")) {
-                        message = "Le service de géocodage est temporairement indisponible. Réessayez plus tard.";
-                    }
-                }
-                return { success: false, files: [], error: message };
+            } else if (task.status === 'SUCCESS' || task.status === 'FAILURE') {
+                return finishedTask(task, onProgress);
             }
         }
 
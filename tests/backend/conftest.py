@@ -16,3 +16,15 @@ def mock_celery_task(mocker):
     mock_delay.id = "mock-task-id-123"
     mock_task.delay.return_value = mock_delay
     return mock_task
+
+@pytest.fixture
+def sample_data():
+    """Minimal raw fetcher output: a 4-node lat/lon street graph in Paris."""
+    import networkx as nx
+    G = nx.MultiDiGraph(crs="EPSG:4326")
+    for n, (x, y) in enumerate([(2.35, 48.85), (2.36, 48.85), (2.36, 48.86), (2.35, 48.86)]):
+        G.add_node(n, x=x, y=y)
+    G.add_edge(0, 1, highway="primary")
+    G.add_edge(1, 2, highway="residential")
+    G.add_edge(2, 3, highway="footway")
+    return {"graph": G, "water": None, "parks": None}
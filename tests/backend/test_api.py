@@ -41,3 +41,137 @@ def test_generate_invalid_payload(client):
     }
     response = client.post("/generate", json=payload)
     assert response.status_code == 422 # FastAPI validation error
+
+def test_generate_deduplicates_identical_requests(client, mock_celery_task, mocker):
+    """Identical requests share one task; a different request gets its own, a failed one is retried."""
+    import threading
+
+    class _FakeRedis:
+        def __init__(self):
+            self.data, self.mutex = {}, threading.Lock()
+
+        def set(self, key, value, nx=False, ex=None):
+            with self.mutex:
+                if nx and key in self.data:
+                    return None
+                self.data[key] = value if isinstance(value, bytes) else value.encode()
+                return True
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def delete(self, key):
+            self.data.pop(key, None)
+
+    from backend.main import limiter
+    mocker.patch.object(limiter, "enabled", False)
+    mocker.patch("backend.inflight.get_redis_client", return_value=_FakeRedis())
+    mocker.patch("backend.inflight._unavailable_until", 0.0)
+    state = mocker.patch("backend.inflight._task_state", return_value="PROGRESS")
+    alive = mocker.patch("backend.inflight.is_alive", return_value=True)
+    ids = iter(f"task-{i}" for i in range(10))
+    mock_celery_task.delay.side_effect = lambda data: mocker.Mock(id=next(ids))
+
+    payload = {"city": "TestCity", "country": "TestCountry", "style": "noir"}
+    assert [client.post("/generate", json=payload).json()["task_id"] for _ in range(3)] == ["task-0"] * 3
+    assert client.post("/generate", json=dict(payload, dpi=150)).json()["task_id"] == "task-1"
+    assert mock_celery_task.delay.call_count == 2
+
+    state.return_value = "FAILURE"
+    assert client.post("/generate", json=payload).json()["task_id"] == "task-2"
+
+    # Still PROGRESS but no heartbeat: its worker died, start over
+    state.return_value = "PROGRESS"
+    alive.return_value = False
+    assert client.post("/generate", json=payload).json()["task_id"] == "task-3"
+
+def test_previews_have_their_own_rate_limit(client, mock_celery_task, mocker):
+    """Spent print job budget does not block previews."""
+    from backend.main import limiter
+    limiter.reset()
+    mocker.patch("backend.inflight._unavailable_until", float("inf"))  # no dedupe: every call enqueues
+    payload = {"city": "TestCity", "country": "TestCountry"}
+
+    statuses = [client.post("/generate", json=dict(payload, distance=1000 + i)).status_code for i in range(6)]
+    assert statuses == [200] * 5 + [429]
+    response = client.post("/preview", json=payload)
+    assert response.status_code == 200
+    assert mock_celery_task.delay.call_args.args[0]["preview"] is True
+    limiter.reset()
+
+def test_task_events_stream(client, mocker):
+    """The stream sends the current status, then updates until the task completes."""
+    import json
+    async def subscribed(hub):
+        hub._subscribed.set()
+    mocker.patch("backend.main.ProgressHub._read", new=subscribed)
+    mocker.patch("backend.main.EVENTS_KEEPALIVE", 0.01)
+    progress = {"task_id": "t1", "status": "PROGRESS", "result": None, "error": None,
+                "progress": {"current": 20, "total": 100, "status": "Fetching map data..."}}
+    done = {"task_id": "t1", "status": "SUCCESS", "result": {"file_url": "u"}, "error": None,
+            "progress": {"current": 100, "total": 100, "status": "Completed"}}
+    mocker.patch("backend.main._task_status", side_effect=[progress, progress, done])
+
+    with client.stream("GET", "/tasks/t1/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+    assert [e["status"] for e in events] == ["PROGRESS", "SUCCESS"]
+    assert ": keep-alive" in body
+
+
+def test_progress_task_publishes_updates(mocker):
+    """Worker updates and outcomes are published on the task's channel."""
+    import json
+    from backend.tasks import generate_poster_task
+
+    redis_client = mocker.Mock()
+    mocker.patch("backend.progress.get_redis_client", return_value=redis_client)
+    mocker.patch("celery.app.task.Task.update_state")
+
+    generate_poster_task.update_state(task_id="t1", state="PROGRESS", meta={"current": 30})
+    generate_poster_task.on_success({"file_url": "u"}, "t1", (), {})
+    channels = [c.args[0] for c in redis_client.publish.call_args_list]
+    events = [json.loads(c.args[1]) for c in redis_client.publish.call_args_list]
+    assert channels == ["progress:t1", "progress:t1"]
+    assert events[0]["progress"] == {"current": 30} and events[1]["status"] == "SUCCESS"
+
+
+def test_progress_hub_waits_for_subscription(mocker):
+    """subscribe() returns once Redis confirms the subscription, then delivers the task's events."""
+    import asyncio
+    import json
+    from backend.progress import ProgressHub
+
+    messages = [None, {"type": "psubscribe", "channel": b"progress:*", "data": 1},
+                {"type": "pmessage", "channel": b"progress:t1", "data": json.dumps({"status": "PROGRESS"})}]
+    confirmed = []
+
+    class _PubSub:
+        async def psubscribe(self, pattern):
+            pass
+
+        async def get_message(self, timeout=None):
+            await asyncio.sleep(0.01)
+            if messages:
+                message = messages.pop(0)
+                confirmed.append(message is not None and message["type"] == "psubscribe")
+                return message
+            return None
+
+        async def aclose(self):
+            pass
+
+    redis_client = mocker.Mock(pubsub=_PubSub, aclose=mocker.AsyncMock())
+    mocker.patch("backend.progress.aioredis.from_url", return_value=redis_client)
+
+    async def stream():
+        hub = ProgressHub()
+        queue = await hub.subscribe("t1")
+        assert confirmed == [False, True]  # not before the confirmation
+        event = await asyncio.wait_for(queue.get(), timeout=1)
+        hub.unsubscribe("t1", queue)
+        await hub._reader
+        return event
+
+    assert asyncio.run(stream()) == {"status": "PROGRESS"}
@@ -0,0 +1,158 @@
+import os
+import time
+from collections import Counter
+
+import geopandas as gpd
+import networkx as nx
+from shapely.geometry import LineString, Polygon
+from backend.cache import DiskCache
+
+
+def test_graph_roundtrip_arrow(mocker, tmp_path):
+    """Graphs are stored as an Arrow edge table and rebuilt with render attributes."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    G.add_node(1, x=2.35, y=48.85, street_count=3)
+    G.add_node(2, x=2.36, y=48.86)
+    G.add_edge(1, 2, highway=["primary", "secondary"], name="Rue", geometry=LineString([(2.35, 48.85), (2.36, 48.86)]))
+    G.add_edge(2, 1, highway="primary")
+
+    DiskCache.set("graph_test", G)
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".arrow", ".meta"]
+
+    H = DiskCache.get("graph_test")
+    assert H.graph["crs"] == "epsg:4326"
+    assert H.nodes[1] == {"x": 2.35, "y": 48.85}
+    assert H.edges[1, 2, 0]["highway"] == "primary"
+    assert H.edges[1, 2, 0]["geometry"].equals(G.edges[1, 2, 0]["geometry"])
+    assert "geometry" not in H.edges[2, 1, 0]
+
+
+def test_features_stored_as_geoparquet(mocker, tmp_path):
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    gdf = gpd.GeoDataFrame({"natural": ["water"]}, geometry=[Polygon([(0, 0), (1, 0), (1, 1)])], crs="EPSG:4326")
+    DiskCache.set("feat_test", gdf)
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".meta", ".parquet"]
+    assert DiskCache.get("feat_test").equals(gdf)
+
+
+def test_other_values_are_pickled(mocker, tmp_path):
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    DiskCache.set("coords_paris_france", (48.85, 2.35))
+    assert DiskCache.get("coords_paris_france") == (48.85, 2.35)
+    assert DiskCache.get("missing") is None
+
+
+def test_get_roads_from_arrow(mocker, tmp_path):
+    """Columnar graph entries load straight into a packed RoadNetwork."""
+    from backend.roads import RoadNetwork
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    G.add_node(1, x=0.0, y=0.0)
+    G.add_node(2, x=1.0, y=0.0)
+    G.add_node(3, x=1.0, y=1.0)
+    G.add_edge(1, 2, highway="motorway")
+    G.add_edge(2, 1, highway="motorway")
+    G.add_edge(2, 3, geometry=LineString([(1, 0), (2, 0.5), (1, 1)]))
+    DiskCache.set("graph_roads", G)
+
+    roads = DiskCache.get_roads("graph_roads")
+    expected = RoadNetwork.from_graph(G)
+    assert (roads.coords == expected.coords).all()
+    assert (roads.offsets == expected.offsets).all()
+    assert (roads.classes == expected.classes).all()
+
+
+def test_expired_entries_are_misses(mocker, tmp_path):
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch.object(DiskCache, "_counters", Counter())
+    DiskCache.set("short", 1, ttl=60)
+    DiskCache.set("forever", 2, ttl=0)
+    assert DiskCache.get("short") == 1
+
+    mocker.patch("backend.cache.time.time", return_value=time.time() + 120)
+    assert DiskCache.get("short") is None
+    assert DiskCache.get("forever") == 2
+    assert len(list(tmp_path.iterdir())) == 2  # expired data + meta removed
+
+    stats = DiskCache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["writes"]) == (2, 1, 1, 2)
+
+
+def test_lru_eviction_over_budget(mocker, tmp_path):
+    """Least recently read entries go first once the byte budget is exceeded."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.cache.CACHE_MAX_BYTES", 0)
+    blob = b"x" * 10_000
+    for i, key in enumerate(("a", "b", "c")):
+        DiskCache.set(key, blob)
+        path = DiskCache._find(DiskCache._hash_key(key))[1]
+        os.utime(path, (1000 + i, 1000 + i))
+    DiskCache.get("a")  # "b" is now the least recently used
+
+    assert DiskCache.evict(max_bytes=25_000) == 1
+    assert DiskCache.get("b") is None
+    assert DiskCache.get("a") == blob and DiskCache.get("c") == blob
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+
+
+def test_writes_scan_only_near_budget(mocker, tmp_path):
+    """Writes keep a running total: the directory is scanned again only once it crosses the budget."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.cache.CACHE_MAX_BYTES", 100_000)
+    mocker.patch.object(DiskCache, "_approx_bytes", None)
+    scans = mocker.spy(DiskCache, "_entries")
+    blob = b"x" * 10_000
+    for i in range(8):
+        DiskCache.set(f"k{i}", blob)
+    assert scans.call_count == 1  # first write of the process only
+
+    for i in range(8, 11):
+        DiskCache.set(f"k{i}", blob)
+    assert scans.call_count == 2
+    assert DiskCache.get("k0") is None and DiskCache.get("k10") == blob
+
+
+class _FakeS3:
+    """Minimal get_object/upload_file over a dict."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        with open(filename, "rb") as f:
+            self.objects[key] = (f.read(), ExtraArgs["Metadata"])
+
+    def get_object(self, Bucket, Key):
+        import io
+        from botocore.exceptions import ClientError
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body, metadata = self.objects[Key]
+        return {"Body": io.BytesIO(body), "Metadata": metadata}
+
+
+def test_shared_l2_warms_a_new_node(mocker, tmp_path):
+    """An entry written by one node is read through (and decompressed) by another."""
+    from backend.cache import S3Tier
+    s3 = _FakeS3()
+    mocker.patch("backend.cache.CACHE_S3_BUCKET", "osm-cache")
+    mocker.patch.object(S3Tier, "_client", s3)
+    mocker.patch.object(S3Tier, "_unavailable_until", 0.0)
+
+    node_a, node_b = tmp_path / "a", tmp_path / "b"
+    node_a.mkdir()
+    node_b.mkdir()
+    mocker.patch("backend.cache.CACHE_DIR", node_a)
+    gdf = gpd.GeoDataFrame({"natural": ["water"] * 50}, geometry=[Polygon([(0, 0), (1, 0), (1, 1)])] * 50,
+                           crs="EPSG:4326")
+    DiskCache.set("feat_shared", gdf)
+    DiskCache.flush()
+    (body, metadata), = s3.objects.values()
+    assert metadata["suffix"] == ".parquet"
+    assert len(body) < sum(p.stat().st_size for p in node_a.glob("*.parquet"))
+
+    mocker.patch("backend.cache.CACHE_DIR", node_b)
+    assert DiskCache.get("feat_shared").equals(gdf)
+    assert sorted(p.suffix for p in node_b.iterdir()) == [".meta", ".parquet"]
+    assert DiskCache.get("feat_missing") is None
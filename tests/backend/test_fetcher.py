@@ -0,0 +1,164 @@
+import asyncio
+import geopandas as gpd
+from shapely.geometry import Polygon
+from backend.fetcher import MapDataFetcher
+from backend.roads import RoadNetwork
+from backend.geometry import PolygonSet
+
+
+def test_fetch_projected_uses_projected_cache(mocker, tmp_path, sample_data):
+    """A second fetch of the same area is served from the projected tier."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    graph = mocker.patch("backend.sources.ox.graph_from_bbox", return_value=sample_data["graph"])
+    water = gpd.GeoDataFrame({"natural": ["water"]},
+                             geometry=[Polygon([(2.351, 48.851), (2.354, 48.851), (2.354, 48.854)])],
+                             crs="EPSG:4326")
+    features = mocker.patch("backend.sources.ox.features_from_bbox", return_value=water)
+
+    first = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000))
+    assert isinstance(first["roads"], RoadNetwork)
+    assert isinstance(first["water"], PolygonSet)
+    assert first["crs"] == first["roads"].crs == "EPSG:32631"
+
+    raw_get = mocker.spy(MapDataFetcher, "_fetch_roads_sync")
+    second = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000))
+    assert raw_get.call_count == 0
+    assert graph.call_count == 1
+    assert features.call_count == 1  # water + parks in one query, first run only
+    assert (second["roads"].coords == first["roads"].coords).all()
+
+
+def test_nearby_requests_reuse_cached_tiles(mocker, tmp_path, sample_data):
+    """A request nested in already fetched tiles triggers no download."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    graph = mocker.patch("backend.sources.ox.graph_from_bbox", return_value=sample_data["graph"])
+    lake = gpd.GeoDataFrame({"natural": ["water"]}, geometry=[Polygon([(2.30, 48.85), (2.40, 48.85), (2.40, 48.86)])],
+                            crs="EPSG:4326")
+    features = mocker.patch("backend.sources.ox.features_from_bbox", return_value=lake)
+
+    roads = MapDataFetcher._fetch_roads_sync((48.855, 2.355), 1000)
+    assert len(roads) == 3
+    water = MapDataFetcher._fetch_features_sync((48.855, 2.355), 1000, MapDataFetcher.WATER_TAGS, "water")
+    assert len(water) == 1
+
+    # 300 m away and smaller: same tiles
+    assert len(MapDataFetcher._fetch_roads_sync((48.857, 2.358), 800)) == 3
+    nested = MapDataFetcher._fetch_features_sync((48.857, 2.358), 800, MapDataFetcher.WATER_TAGS, "water")
+    assert len(nested) == 1  # the lake spans several tiles but is merged once
+    assert graph.call_count == 1
+    assert features.call_count == 1
+
+
+def test_feature_layers_share_one_query(mocker, tmp_path, sample_data):
+    """All layers come from one download; a new custom layer leaves the base layers' tiles cached."""
+    from backend.models import CustomLayer
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.sources.ox.graph_from_bbox", return_value=sample_data["graph"])
+    square = lambda x: Polygon([(x, 48.852), (x + 0.002, 48.852), (x + 0.002, 48.854)])
+    osm = gpd.GeoDataFrame({"natural": ["water", None, None], "leisure": [None, "park", None],
+                            "amenity": [None, None, "school"]},
+                           geometry=[square(2.350), square(2.353), square(2.356)], crs="EPSG:4326")
+    features = mocker.patch("backend.sources.ox.features_from_bbox", return_value=osm)
+
+    asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000))
+    assert features.call_count == 1
+    assert set(features.call_args.kwargs["tags"]) == {"natural", "waterway", "leisure", "landuse"}
+    # Each layer's tiles hold its own rows and columns only
+    water = MapDataFetcher._fetch_features_sync((48.855, 2.355), 1000, MapDataFetcher.WATER_TAGS, "water")
+    parks = MapDataFetcher._fetch_features_sync((48.855, 2.355), 1000, MapDataFetcher.PARKS_TAGS, "parks")
+    assert list(water["natural"]) == ["water"] and "leisure" not in water.columns
+    assert list(parks["leisure"]) == ["park"]
+
+    schools = CustomLayer(label="schools", tags={"amenity": "school"}, color="#ff0000")
+    data = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000, [schools]))
+    assert features.call_count == 2
+    assert features.call_args.kwargs["tags"] == {"amenity": ["school"]}
+    assert len(data["custom_0"]) == 1
+
+
+class _FakeRedis:
+    """In-process stand-in for redis locks: one threading.Lock per name."""
+
+    def __init__(self):
+        self.locks = {}
+
+    def lock(self, name, timeout=None, blocking_timeout=None):
+        import threading
+        lock = self.locks.setdefault(name, threading.Lock())
+
+        class _Lock:
+            acquire = lambda _: lock.acquire(timeout=blocking_timeout)
+            release = lambda _: lock.release()
+        return _Lock()
+
+
+def test_concurrent_fetches_download_once(mocker, tmp_path, sample_data):
+    """Two workers missing the same tiles: one downloads, the other reuses the result."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.locks.get_redis_client", return_value=_FakeRedis())
+    mocker.patch("backend.locks._unavailable_until", 0.0)
+
+    def slow_download(*args, **kwargs):
+        time.sleep(0.2)
+        return sample_data["graph"]
+    graph = mocker.patch("backend.sources.ox.graph_from_bbox", side_effect=slow_download)
+
+    with ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(lambda _: MapDataFetcher._fetch_roads_sync((48.855, 2.355), 1000), range(2)))
+    assert [len(r) for r in results] == [3, 3]
+    assert graph.call_count == 1
+
+
+def test_fetch_from_local_extract(mocker, tmp_path):
+    """With a local extract as data source, a poster's layers are fetched without any network call."""
+    from pathlib import Path
+    from backend.sources import ExtractSource
+
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    source = ExtractSource(Path(__file__).parent / "fixtures" / "paris_small.osm")
+    mocker.patch("backend.sources._source", source)
+    overpass = mocker.patch("backend.sources.ox.graph_from_bbox")
+
+    data = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 500))
+    assert len(data["roads"]) > 0
+    assert len(data["water"]) == 1 and len(data["parks"]) == 1
+    assert MapDataFetcher.graph_tile_key((0, 0)).endswith(source.key)  # never mixed with Overpass tiles
+    overpass.assert_not_called()
+
+
+def test_road_filter_prunes_cached_tiles(mocker, tmp_path, sample_data):
+    """Pruned networks are derived from the full cached tiles, under their own projected key."""
+    from backend.roads import road_filter_for
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    graph = mocker.patch("backend.sources.ox.graph_from_bbox", return_value=sample_data["graph"])
+    mocker.patch("backend.sources.ox.features_from_bbox", return_value=gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"))
+
+    assert road_filter_for(5000) == "all" and road_filter_for(30000) == "drive"
+    assert road_filter_for(5000, [{"street_filter": "major"}, {}]) == "all"  # the theme without one keeps its streets
+    assert road_filter_for(30000, [{"street_filter": "major"}, {}]) == "drive"
+    assert road_filter_for(5000, [{"street_filter": "major"}]) == "major"
+
+    full = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000))["roads"]
+    drive = asyncio.run(MapDataFetcher.fetch_projected(48.855, 2.355, 1000, road_filter="drive"))["roads"]
+    major = MapDataFetcher._fetch_graph_sync((48.855, 2.355), 1000, "major")
+    assert (len(full), len(drive)) == (3, 2)  # the footway is gone
+    assert [h for _, _, h in major.edges(data="highway")] == ["primary"]
+    assert graph.call_count == 1
+
+
+def test_extract_slice_keeps_complete_ways(tmp_path):
+    """A bbox cut keeps the ways touching it whole, and nothing else."""
+    import xml.etree.ElementTree as ET
+    from pathlib import Path
+    from backend.sources import cut_xml
+
+    out = tmp_path / "slice.osm"
+    # Around node 1 (south-west corner of the grid) only
+    cut_xml(Path(__file__).parent / "fixtures" / "paris_small.osm", (2.3515, 48.8515, 2.3525, 48.8522), out)
+    root = ET.parse(out).getroot()
+    ways = {w.get("id") for w in root.iter("way")}
+    nodes = {n.get("id") for n in root.iter("node")}
+    assert "100" in ways and "101" not in ways and "109" not in ways
+    assert {"1", "2", "3", "4"} <= nodes and "16" not in nodes
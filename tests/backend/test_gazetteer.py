@@ -0,0 +1,40 @@
+from backend.gazetteer import Gazetteer, build
+
+CITIES = [
+    # geonameid, name, asciiname, alternatenames, lat, lon, class, code, cc, cc2, admin1-4, population
+    "1\tParis\tParis\t\t48.85341\t2.3488\tP\tPPLC\tFR\t\t11\t75\t\t\t2138551",
+    "2\tParis\tParis\t\t33.66094\t-95.55551\tP\tPPLA2\tUS\t\tTX\t277\t\t\t24782",
+    "3\tParis\tParis\t\t36.302\t-88.32671\tP\tPPLA2\tUS\t\tTN\t079\t\t\t10156",
+    "4\tSaint-Étienne\tSaint-Etienne\t\t45.43389\t4.39\tP\tPPLA2\tFR\t\t84\t42\t\t\t171924",
+    "5\tVillage\tVillage\t\t1.0\t1.0\tP\tPPL\tFR\t\t\t\t\t\t500",
+]
+COUNTRIES = [
+    "#ISO\tISO3\tISO-Numeric\tfips\tCountry",
+    "FR\tFRA\t250\tFR\tFrance",
+    "US\tUSA\t840\tUS\tUnited States",
+]
+
+
+def test_gazetteer_lookup(tmp_path):
+    """Names match regardless of case/accents; homonyms resolve to the most populated city."""
+    path = tmp_path / "gazetteer.tsv.gz"
+    assert build(CITIES, COUNTRIES, path, min_population=15000) == 3
+    index = Gazetteer.load(path)
+
+    assert index.lookup("paris", "France") == (48.85341, 2.3488)
+    assert index.lookup("Paris", "USA") == (33.66094, -95.55551)
+    assert index.lookup("PARIS", "united states") == (33.66094, -95.55551)
+    assert index.lookup("Saint Etienne", "fr") == index.lookup("saint-étienne", "FRA") == (45.43389, 4.39)
+    assert index.lookup("Village", "France") is None
+    assert index.lookup("Paris", "Atlantis") is None
+
+
+def test_get_coordinates_uses_gazetteer(mocker):
+    """Cities found offline never reach the disk cache or Nominatim."""
+    import asyncio
+    from backend import utils
+
+    mocker.patch("backend.gazetteer.lookup", return_value=(48.85, 2.35))
+    nominatim = mocker.patch("backend.utils.Nominatim")
+    assert asyncio.run(utils.get_coordinates("Paris", "France")) == (48.85, 2.35)
+    nominatim.assert_not_called()
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+from backend.geocode import NominatimProxy, normalize_query
+
+
+def test_geocode_cache_and_coalescing(mocker):
+    """Concurrent identical queries share one upstream call; repeats are served from memory."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["q"])
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[{"lat": "48.85", "lon": "2.35"}])
+
+    async def scenario():
+        proxy = NominatimProxy(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        mocker.patch.object(proxy, "_shared", return_value=None)
+        first = await asyncio.gather(*(proxy.search(q) for q in ["Paris", " paris ", "PARIS", "Lyon"]))
+        again = await proxy.search("paris")
+        await proxy.aclose()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert sorted(calls) == ["lyon", "paris"]
+    assert first[0] == first[1] == again == [{"lat": "48.85", "lon": "2.35"}]
+    assert normalize_query("  Saint-Étienne  FRANCE ") == "saint-étienne france"
+
+
+def test_geocode_errors_not_cached():
+    """Upstream errors propagate to every waiter and are retried on the next call."""
+    import pytest
+    from backend.geocode import GeocodeError
+
+    statuses = iter([503, 200])
+
+    async def handler(request):
+        return httpx.Response(next(statuses), json=[])
+
+    async def scenario():
+        proxy = NominatimProxy(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        proxy._redis_down_until = float("inf")
+        with pytest.raises(GeocodeError):
+            await proxy.search("nowhere")
+        results = await proxy.search("nowhere")
+        await proxy.aclose()
+        return results
+
+    assert asyncio.run(scenario()) == []
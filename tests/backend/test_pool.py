@@ -0,0 +1,74 @@
+import os
+import time
+
+import billiard
+from backend.pool import render_themes
+from backend.renderer import MapRenderer
+from backend.utils import load_theme
+
+
+def _scene(data):
+    return MapRenderer(load_theme("noir")).prepare(data, "Paris", "France", point=(48.855, 2.355),
+                                                   dist=1000, width_in=3, height_in=4, text_CONFIG={})
+
+
+def _save_pid(fig, f, fmt, dpi, bg):
+    """Stands in for save_figure: records which process rendered the theme."""
+    time.sleep(0.2)  # long enough for every worker to pick up a theme
+    f.write(str(os.getpid()).encode())
+
+
+def _render_pids(scene, themes):
+    """Render `themes` over 2 workers; returns the PIDs that wrote the files, by theme."""
+    pids = {}
+    for theme_id, path in render_themes(scene, themes, "png", dpi=20, workers=2):
+        with open(path) as f:
+            pids[theme_id] = int(f.read())
+        os.remove(path)
+    return pids
+
+
+def _render_in_child(scene, themes, results):
+    results.put(_render_pids(scene, themes))
+
+
+def test_render_themes_parallel(sample_data, mocker):
+    """Every theme is rasterized once by the forked pool and handed back as a file."""
+    from backend.cache import DiskCache
+    flush = mocker.spy(DiskCache, "flush")
+    themes = {name: load_theme(name) for name in ("noir", "ocean", "sunset")}
+    results = dict(render_themes(_scene(sample_data), themes, "png", dpi=20, workers=2))
+    assert flush.call_count == 1  # cache uploads drained before forking
+    assert sorted(results) == sorted(themes)
+    for path in results.values():
+        with open(path, "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+        os.remove(path)
+
+
+def test_render_themes_uses_several_workers(sample_data, mocker):
+    mocker.patch("backend.pool.save_figure", _save_pid)
+    themes = {name: load_theme(name) for name in ("noir", "ocean", "sunset", "forest")}
+    pids = _render_pids(_scene(sample_data), themes)
+    assert sorted(pids) == sorted(themes)
+    assert len(set(pids.values())) > 1 and os.getpid() not in pids.values()
+
+
+def test_render_themes_from_daemonic_worker(sample_data, mocker):
+    """Celery's prefork workers are daemonic processes: the themes must still fan out."""
+    mocker.patch("backend.pool.save_figure", _save_pid)
+    themes = {name: load_theme(name) for name in ("noir", "ocean", "sunset", "forest")}
+    ctx = billiard.get_context("fork")
+    results = ctx.Queue()
+    worker = ctx.Process(target=_render_in_child, args=(_scene(sample_data), themes, results), daemon=True)
+    worker.start()
+    pids = results.get(timeout=60)
+    worker.join()
+    assert sorted(pids) == sorted(themes)
+    assert len(set(pids.values())) > 1 and worker.pid not in pids.values()
+
+
+def test_render_themes_sequential(sample_data):
+    results = list(render_themes(_scene(sample_data), {"noir": load_theme("noir")}, "svg", dpi=20, workers=1))
+    assert [theme_id for theme_id, _ in results] == ["noir"]
+    os.remove(results[0][1])
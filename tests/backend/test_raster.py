@@ -0,0 +1,46 @@
+import io
+import numpy as np
+from PIL import Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from backend.renderer import MapRenderer
+from backend import raster
+from backend.raster import save_figure, write_png_bands
+
+THEME = {
+    "bg": "#FFFFFF", "text": "#000000", "gradient_color": "#FFFFFF",
+    "water": "#C0C0C0", "parks": "#F0F0F0",
+    "road_motorway": "#000000", "road_primary": "#111111", "road_secondary": "#222222",
+    "road_tertiary": "#333333", "road_residential": "#444444", "road_default": "#555555",
+}
+
+
+def _png(data: bytes) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+
+def test_banded_png_matches_full_render(sample_data):
+    """Bands of 7 rows stitch into the same image as one full Agg render."""
+    scene = MapRenderer(THEME).prepare(sample_data, "Paris", "France", (48.855, 2.355), 600, 3, 4, margins=0.25)
+    full = io.BytesIO()
+    FigureCanvasAgg(scene.fig).print_figure(full, format="png", dpi=40, facecolor=THEME["bg"])
+
+    banded = io.BytesIO()
+    write_png_bands(scene.fig, banded, 40, THEME["bg"], band_pixels=120 * 7)
+    expected, actual = _png(full.getvalue()), _png(banded.getvalue())
+    assert actual.shape == expected.shape
+    # Only float round-off on exact half-pixel snapping ties may differ
+    assert (actual != expected).any(axis=2).mean() < 0.001
+
+    # The scene is left as it was (themes are rendered one after another)
+    again = io.BytesIO()
+    FigureCanvasAgg(scene.fig).print_figure(again, format="png", dpi=40, facecolor=THEME["bg"])
+    assert again.getvalue() == full.getvalue()
+
+
+def test_save_figure_bands_large_png(mocker, sample_data):
+    mocker.patch("backend.raster.TILED_RENDER_PIXELS", 1000)
+    bands = mocker.spy(raster, "write_png_bands")
+    fig = MapRenderer(THEME).render(sample_data, "Paris", "France", (48.855, 2.355), 600, 3, 4)
+    save_figure(fig, io.BytesIO(), "png", 20, THEME["bg"])
+    save_figure(fig, io.BytesIO(), "pdf", 20, THEME["bg"])
+    assert bands.call_count == 1
@@ -13,3 +13,59 @@ def test_renderer_initialization():
 # We would need to mock the entire 'data' dictionary with valid GeoDataFrames.
 # For Phase 5 'Safety Net', ensuring the class initializes is a good start.
 # A more advanced test would mock OSM fetcher data.
+
+
+def test_render_draws_roads(sample_data):
+    """Roads are drawn as one LineCollection per road class."""
+    from matplotlib.collections import LineCollection
+    from backend.utils import load_theme
+
+    renderer = MapRenderer(load_theme("noir"))
+    fig = renderer.render(sample_data, "Paris", "France", point=(48.855, 2.355), dist=1000,
+                          width_in=12, height_in=16, text_CONFIG={})
+    collections = [c for c in fig.axes[0].collections if isinstance(c, LineCollection)]
+    assert len(collections) == 3
+
+
+def test_prepared_scene_applies_theme(sample_data):
+    """Retheming recolors existing artists instead of rebuilding the figure."""
+    import geopandas as gpd
+    import matplotlib.colors as mcolors
+    from shapely.geometry import Polygon
+    from backend.utils import load_theme
+
+    data = sample_data
+    data["water"] = gpd.GeoDataFrame(
+        geometry=[Polygon([(2.351, 48.851), (2.354, 48.851), (2.354, 48.854)])], crs="EPSG:4326")
+    scene = MapRenderer(load_theme("noir")).prepare(data, "Paris", "France", point=(48.855, 2.355), dist=1000,
+                                                    width_in=12, height_in=16, text_CONFIG={})
+    artists = list(scene.ax.get_children())
+
+    pastel = load_theme("pastel_dream")
+    scene.apply_theme(pastel)
+    assert list(scene.ax.get_children()) == artists
+    assert tuple(scene.layers["water"].get_facecolor()[0]) == mcolors.to_rgba(pastel["water"])
+    assert scene.texts[0].get_color() == pastel["text"]
+
+
+def test_layers_clipped_to_viewport(sample_data):
+    """Edges and features outside the visible rectangle are dropped, large polygons are cut."""
+    import geopandas as gpd
+    from shapely.geometry import Polygon, box
+    from backend.projection import project_data, viewport_lonlat
+
+    data = sample_data
+    data["graph"].add_node(9, x=2.50, y=48.95)
+    data["graph"].add_edge(3, 9, highway="primary")
+    data["graph"].add_edge(9, 9, highway="primary")
+    data["water"] = gpd.GeoDataFrame(
+        geometry=[box(2.0, 48.0, 3.0, 49.0), Polygon([(2.6, 48.6), (2.7, 48.6), (2.7, 48.7)])], crs="EPSG:4326")
+
+    bbox = viewport_lonlat((48.855, 2.355), 1000, 12, 16)
+    assert bbox[0] < 2.355 < bbox[2] and bbox[1] < 48.855 < bbox[3]
+    clipped = project_data(data, (48.855, 2.355), bbox=bbox)
+    full = project_data(data, (48.855, 2.355))
+    assert len(full["roads"]) == 5 and len(clipped["roads"]) == 4
+    assert len(full["water"]) == 2 and len(clipped["water"]) == 1
+    assert len(clipped["water"].vertices) == 5
+    assert (clipped["water"].vertices.max(axis=0) - clipped["water"].vertices.min(axis=0) < 3000).all()
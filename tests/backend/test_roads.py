@@ -0,0 +1,100 @@
+import networkx as nx
+import numpy as np
+import matplotlib.colors as mcolors
+from backend.roads import classify_edges, edge_colors, edge_widths, DEFAULT_CLASS
+
+
+def _graph():
+    G = nx.MultiDiGraph()
+    G.add_edge(1, 2, highway="motorway")
+    G.add_edge(2, 3, highway=["primary", "secondary"])
+    G.add_edge(3, 4, highway="residential")
+    G.add_edge(4, 5, highway="footway")
+    G.add_edge(5, 6)
+    return G
+
+
+def test_classify_edges():
+    """Edges are classified in G.edges order, lists use their first tag."""
+    classes = classify_edges(_graph())
+    assert classes.dtype == np.uint8
+    assert classes.tolist() == [0, 1, 4, DEFAULT_CLASS, DEFAULT_CLASS]
+
+
+def test_edge_style_lookup():
+    """Colors and widths come from the theme tables."""
+    theme = {"road_motorway": "#FF0000", "road_primary": "#00FF00"}
+    classes = classify_edges(_graph())
+    colors = edge_colors(classes, theme)
+    assert colors.shape == (5, 4)
+    assert tuple(colors[0]) == mcolors.to_rgba("#FF0000")
+    assert tuple(colors[1]) == mcolors.to_rgba("#00FF00")
+    assert edge_widths(classes).tolist() == [1.2, 1.0, 0.4, 0.4, 0.4]
+
+
+def test_road_network_from_graph():
+    """Edges are packed into one coordinate array; reverse duplicates are dropped."""
+    from shapely.geometry import LineString
+    from backend.roads import RoadNetwork
+
+    G = nx.MultiDiGraph(crs="EPSG:32631")
+    G.add_node(1, x=0.0, y=0.0)
+    G.add_node(2, x=10.0, y=0.0)
+    G.add_node(3, x=10.0, y=10.0)
+    G.add_edge(1, 2, highway="primary")
+    G.add_edge(2, 1, highway="primary")
+    G.add_edge(2, 3, highway="motorway", geometry=LineString([(10, 0), (12, 5), (10, 10)]))
+
+    roads = RoadNetwork.from_graph(G)
+    assert len(roads) == 2
+    assert roads.crs == "EPSG:32631"
+    assert roads.offsets.tolist() == [0, 2, 5]
+    assert roads.classes.tolist() == [1, 0]
+    assert roads.lines()[1].tolist() == [[10, 0], [12, 5], [10, 10]]
+
+
+def test_road_network_keeps_distinct_reverse_edges():
+    """Only an edge retracing its reverse twin is a duplicate; a matching key alone is not enough."""
+    from shapely.geometry import LineString
+    from backend.roads import RoadNetwork
+
+    G = nx.MultiDiGraph()
+    G.add_node(1, x=0.0, y=0.0)
+    G.add_node(2, x=10.0, y=0.0)
+    # Two-way street: reverse duplicate
+    G.add_edge(1, 2, highway="primary", geometry=LineString([(0, 0), (5, 2), (10, 0)]))
+    G.add_edge(2, 1, highway="primary", geometry=LineString([(10, 0), (5, 2), (0, 0)]))
+    # Two one-way ways between the same nodes, same key in each direction
+    G.add_edge(1, 2, highway="secondary", geometry=LineString([(0, 0), (5, -2), (10, 0)]))
+    G.add_edge(2, 1, highway="secondary", geometry=LineString([(10, 0), (5, -4), (0, 0)]))
+    # Straight edges with the same nodes but a different street class
+    G.add_edge(1, 2, highway="residential")
+    G.add_edge(2, 1, highway="footway")
+
+    roads = RoadNetwork.from_graph(G)
+    assert len(roads) == 5
+    assert sorted(roads.classes.tolist()) == [1, 2, 2, 4, DEFAULT_CLASS]
+
+
+def test_simplify_keeps_endpoints():
+    """Sub-tolerance wiggles are dropped; straight edges and end nodes are untouched."""
+    from shapely.geometry import Polygon
+    from backend.geometry import PolygonSet
+    from backend.roads import RoadNetwork
+
+    x = np.linspace(0, 100, 101)
+    wiggly = np.column_stack([x, 0.1 * np.sin(x)])
+    coords = np.vstack([[[0, 10], [50, 60]], wiggly, [[7, 7], [8, 9]]])
+    roads = RoadNetwork(coords, np.array([0, 2, 103, 105]), np.array([0, 1, 2], dtype=np.uint8))
+
+    simple = roads.simplify(1.0)
+    assert np.diff(simple.offsets).tolist() == [2, 2, 2]
+    assert simple.coords.tolist() == [[0, 10], [50, 60], [0, 0], wiggly[-1].tolist(), [7, 7], [8, 9]]
+    assert simple.classes is roads.classes
+    assert roads.simplify(0) is roads
+
+    ring = [(100 + 50 * np.cos(a), 50 * np.sin(a)) for a in np.linspace(0, 2 * np.pi, 400, endpoint=False)]
+    polygons = PolygonSet.from_geometries([Polygon(ring, [[(99, -1), (101, -1), (101, 1), (99, 1)]])])
+    simple = polygons.simplify(5.0)
+    assert len(simple) == 1 and 4 <= len(simple.vertices) < 50
+    assert simple.paths()[0].contains_point((100, 30)) and not simple.paths()[0].contains_point((100, 90))
@@ -0,0 +1,47 @@
+from backend.routing import route_task, estimate_cost, queue_depths, HEAVY_QUEUE, LIGHT_QUEUE, PREVIEW_QUEUE
+
+NAME = "backend.tasks.generate_poster_task"
+
+
+def test_requests_routed_by_cost():
+    """Previews have their own queue; expensive jobs go to the heavy queue, with a lower priority."""
+    small = {"city": "Paris", "dpi": 150, "width": 8, "height": 10, "distance": 3000}
+    large = dict(small, dpi=600, width=36, height=48)
+    themes = dict(small, dpi=300, width=12, height=16, all_themes=True)
+
+    assert route_task(NAME, (dict(large, preview=True),), {}, {}) == {"queue": PREVIEW_QUEUE, "priority": 0}
+    light, heavy = route_task(NAME, (small,), {}, {}), route_task(NAME, (large,), {}, {})
+    assert light["queue"] == LIGHT_QUEUE and heavy["queue"] == HEAVY_QUEUE
+    assert light["priority"] < heavy["priority"]
+    assert route_task(NAME, (themes,), {}, {})["queue"] == HEAVY_QUEUE
+    assert estimate_cost(dict(small, custom_layers=[{"label": "x"}])) > estimate_cost(small)
+    assert route_task("backend.tasks.cache_stats_task", (), {}, {}) is None
+
+
+def test_router_is_registered():
+    """`.delay()` goes through the router configured on the Celery app."""
+    from backend.celery_app import celery_app
+    from backend.tasks import generate_poster_task
+
+    router = celery_app.amqp.router
+    route = router.route({}, generate_poster_task.name, args=({"preview": True},), kwargs={})
+    assert route["queue"].name == PREVIEW_QUEUE
+
+
+def test_queue_depths():
+    """Depths add up the per-priority Redis lists of each queue."""
+    class _Pipe:
+        def __init__(self, lists):
+            self.lists, self.keys = lists, []
+
+        def llen(self, key):
+            self.keys.append(key)
+
+        def execute(self):
+            return [self.lists.get(k, 0) for k in self.keys]
+
+    lists = {"light": 2, "light:4": 3, "heavy:9": 1}
+    client = type("Client", (), {"pipeline": lambda self: _Pipe(lists)})()
+    depths = queue_depths(client)
+    assert depths[LIGHT_QUEUE] == {"pending": 5, "by_priority": {"0": 2, "4": 3}}
+    assert depths[HEAVY_QUEUE]["pending"] == 1 and depths[PREVIEW_QUEUE]["pending"] == 0
@@ -0,0 +1,76 @@
+import io
+import zipfile
+import pytest
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import FigureCanvasPdf
+from backend.storage import S3UploadStream
+
+
+class _FakeS3:
+    """Records put_object and multipart calls, assembles completed uploads."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[Key] = (Body, extra)
+
+    def create_multipart_upload(self, Bucket, Key, **extra):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = (Key, extra, {})
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][2][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        key, extra, parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[key] = (b"".join(parts[n] for n in numbers), extra)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+
+def test_small_output_is_a_single_put():
+    s3 = _FakeS3()
+    with S3UploadStream(s3, "posters", "a.png", content_type="image/png") as out:
+        out.write(b"tiny")
+    assert s3.objects == {"a.png": (b"tiny", {"ContentType": "image/png"})}
+
+
+def test_streamed_zip_and_pdf_use_multipart():
+    """Non-seekable writers (zipfile, PDF backend) produce valid files part by part."""
+    s3 = _FakeS3()
+    fig = Figure(figsize=(2, 2))
+    fig.add_subplot(111).plot([0, 1], [0, 1])
+
+    with S3UploadStream(s3, "posters", "all.zip", part_size=1024) as out:
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+            with zf.open("a.png", "w") as entry:
+                FigureCanvasAgg(fig).print_figure(entry, format="png", dpi=100)
+            zf.writestr("b.txt", b"x" * 5000)
+    with S3UploadStream(s3, "posters", "a.pdf", part_size=1024) as out:
+        FigureCanvasPdf(fig).print_figure(out, format="pdf")
+
+    assert not s3.uploads
+    archive = zipfile.ZipFile(io.BytesIO(s3.objects["all.zip"][0]))
+    assert archive.testzip() is None
+    assert archive.read("a.png").startswith(b"\x89PNG")
+    assert s3.objects["a.pdf"][0].startswith(b"%PDF") and s3.objects["a.pdf"][0].rstrip().endswith(b"%%EOF")
+
+
+def test_error_aborts_upload():
+    s3 = _FakeS3()
+    with pytest.raises(RuntimeError):
+        with S3UploadStream(s3, "posters", "broken.zip", part_size=1024) as out:
+            out.write(b"x" * 4096)
+            raise RuntimeError("render failed")
+    assert s3.aborted == ["broken.zip"]
+    assert not s3.objects and not s3.uploads
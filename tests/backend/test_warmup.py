@@ -0,0 +1,40 @@
+import geopandas as gpd
+from backend import warmup
+from backend.fetcher import MapDataFetcher
+
+
+def test_read_cities(tmp_path):
+    path = tmp_path / "cities.txt"
+    path.write_text("# popular\nParis, France\nWashington, D.C., United States  # capital\n\nnot a city\n")
+    assert warmup.read_cities(path) == [("Paris", "France"), ("Washington, D.C.", "United States")]
+
+
+def test_warmup_fills_projected_cache(mocker, tmp_path, sample_data):
+    """After a warm-up, a request for a preset is served without fetching or projecting."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.gazetteer.lookup", return_value=(48.855, 2.355))
+    graph = mocker.patch("backend.sources.ox.graph_from_bbox", return_value=sample_data["graph"])
+    mocker.patch("backend.sources.ox.features_from_bbox", return_value=gpd.GeoDataFrame(geometry=[], crs="EPSG:4326"))
+
+    stats = warmup.run([("Paris", "France")], distances=[800, 1000], sizes=[(12.0, 16.0)], concurrency=1, interval=0)
+    assert (stats["cities"], stats["warmed"], stats["failed"]) == (1, 2, 0)
+    assert graph.call_count == 1  # the smaller radius reuses the larger one's tiles
+
+    raw = mocker.spy(MapDataFetcher, "_fetch_roads_sync")
+    request = warmup.PosterRequest(city="Paris", country="France", distance=800, width=12.0, height=16.0)
+    data = warmup.asyncio.run(warmup.fetch_poster_data(request, 48.855, 2.355, [{}]))
+    assert data["roads"] is not None and raw.call_count == 0
+
+
+def test_geocode_pauses_only_after_nominatim(mocker, tmp_path):
+    """Cities answered by the gazetteer or the coordinates cache don't wait on Nominatim."""
+    mocker.patch("backend.cache.CACHE_DIR", tmp_path)
+    mocker.patch("backend.gazetteer.lookup", return_value=None)
+    warmup.DiskCache.set("coords_paris_france", (48.855, 2.355))
+    nominatim = mocker.patch("backend.warmup.get_coordinates", return_value=(45.76, 4.83))
+    sleep = mocker.patch("backend.warmup.asyncio.sleep")
+
+    coords = warmup.asyncio.run(warmup.geocode_all([("Paris", "France"), ("Lyon", "France")]))
+    assert coords == {("Paris", "France"): (48.855, 2.355), ("Lyon", "France"): (45.76, 4.83)}
+    nominatim.assert_called_once_with("Lyon", "France")
+    sleep.assert_called_once_with(warmup.NOMINATIM_INTERVAL)